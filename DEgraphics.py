@@ -43,8 +43,19 @@ BAD_OPTION = "Illegal option value"
 ##########################################################################
 # global variables and functions
 
-_root = tk.Tk()
-_root.withdraw()
+# the Tk root is only created once a window (or another Tk object) is actually
+# requested, so importing this module works on machines without a display
+_root = None
+
+def _getRoot():
+    """returns the hidden Tk root, creating it the first time it is needed"""
+    global _root
+    if _root is None:
+        _root = tk.Tk()
+        _root.withdraw()
+        # MacOS fix 1
+        _root.update()
+    return _root
 
 _update_lasttime = time.time()
 
@@ -59,7 +70,7 @@ def update(rate=None):
         else:
             _update_lasttime = now
 
-    _root.update()
+    _getRoot().update()
 
 ############################################################################
 # Graphics classes start here
@@ -81,7 +92,7 @@ class DEGraphWin(tk.Canvas):
                  borderWidth=0):
 
         assert type(title) == type(""), "Title must be a string"
-        self.master = tk.Toplevel(_root)
+        self.master = tk.Toplevel(_getRoot())
         self.master.protocol("WM_DELETE_WINDOW", self.close)
         tk.Canvas.__init__(self, self.master, width=width, height=height,
                            highlightthickness=hThickness,highlightbackground=hBGColor, bd=borderWidth)
@@ -129,13 +140,25 @@ class DEGraphWin(tk.Canvas):
         self.mouseY = None
 
         self.bind("<Button-1>", self._onClick)
+        self.bind("<ButtonRelease-1>", self._onRelease)
         self.bind_all("<Key>", self._onKey)
+        # raw pixel positions of the last press and of the drag that ended at the last release
+        # (a release less than dragThreshold pixels from the press is still a click)
+        self.dragThreshold = 4
+        self.pressX = None
+        self.pressY = None
+        self.lastDrag = None
 
         self.autoflush = autoflush
         self._mouseCallback = None
         self.trans = None
         self.closed = False
 
+        # raster is a Raster (one PhotoImage the size of the window) that
+        # plotRows draws into. It is made the first time it is needed and
+        # always sits underneath the other (vector) items on the canvas.
+        self.raster = None
+
         self.currentCoords = []
         self.setCoords(defCoords[0],defCoords[1],defCoords[2],defCoords[3])
 
@@ -168,8 +191,19 @@ class DEGraphWin(tk.Canvas):
     def _onKey(self, evnt):
         self.lastKey = evnt.keysym
 
+    def hasFocus(self):
+        """Return True if the keyboard focus is on this window (the key
+        binding is shared, so keys typed in other windows reach it too)"""
+        try:
+            return self.focus_get() in (self, self.master)
+        except KeyError:
+            # (focus_get can't name some of tk's own widgets, like the list of a combobox)
+            return False
+
     def clear(self):
         """clears drawn elements on the DEGraphWin"""
+        if self.raster:
+            self.raster.blank()
         self.delete("all")
         self.redraw()
 
@@ -218,6 +252,29 @@ class DEGraphWin(tk.Canvas):
         self.create_line(x,y,x+1,y, fill=color)
         self.__autoflush()
 
+    def getRaster(self):
+        """Returns the Raster behind the window's vector items, creating it if needed"""
+        self.__checkOpen()
+        if not self.raster:
+            self.raster = Raster(self.width, self.height)
+        if not self.raster.isDrawn():
+            self.raster.draw(self)
+            self.tag_lower(self.raster.id)
+        return self.raster
+
+    def plotRows(self, rows, x=0, y=0):
+        """Set a block of raw pixels in one call. rows is a list of rows of
+        color strings, the top-left pixel goes at raw pixel (x,y). Passing
+        every row of the window draws a whole frame as a single canvas item."""
+        self.getRaster().putRows(rows, x, y)
+        self.__autoflush()
+
+    def shiftPixels(self, dx, dy):
+        """Moves everything drawn with plotRows dx raw pixels right and dy down.
+        The strips that are uncovered are left blank"""
+        self.getRaster().shift(dx, dy)
+        self.__autoflush()
+
     def flush(self):
         """Update drawing to the window"""
         self.__checkOpen()
@@ -228,6 +285,7 @@ class DEGraphWin(tk.Canvas):
         self.update()      # flush any prior clicks
         self.mouseX = None
         self.mouseY = None
+        self.lastDrag = None
         while self.mouseX == None or self.mouseY == None:
             self.update()
             if self.isClosed(): raise GraphicsError("getMouse in closed window")
@@ -235,6 +293,8 @@ class DEGraphWin(tk.Canvas):
         x,y = self.toWorld(self.mouseX, self.mouseY)
         self.mouseX = None
         self.mouseY = None
+        # a drag while waiting for the click isn't left for checkDrag
+        self.lastDrag = None
         return Point(x,y)
 
     def checkMouse(self):
@@ -251,6 +311,16 @@ class DEGraphWin(tk.Canvas):
         else:
             return None
 
+    def checkDrag(self):
+        """Return (dx, dy), how far (in raw pixels) the mouse was dragged with the
+        button down, or None if there has been no drag since the last call"""
+        if self.isClosed():
+            raise GraphicsError("checkDrag in closed window")
+        self.update()
+        drag = self.lastDrag
+        self.lastDrag = None
+        return drag
+
     def getKey(self):
         """Wait for user to press a key and return it as a string."""
         self.lastKey = ""
@@ -300,9 +370,22 @@ class DEGraphWin(tk.Canvas):
     def _onClick(self, e):
         self.mouseX = e.x
         self.mouseY = e.y
+        self.pressX = e.x
+        self.pressY = e.y
+        # clicking a window gives it the keyboard focus (a canvas doesn't take it by itself)
+        self.focus_set()
         if self._mouseCallback:
             self._mouseCallback(Point(e.x, e.y))
 
+    def _onRelease(self, e):
+        # a press and release at least dragThreshold pixels apart is a drag (not a click)
+        if self.pressX is not None and max(abs(e.x - self.pressX), abs(e.y - self.pressY)) >= self.dragThreshold:
+            self.lastDrag = (e.x - self.pressX, e.y - self.pressY)
+            self.mouseX = None
+            self.mouseY = None
+        self.pressX = None
+        self.pressY = None
+
     def addItem(self, item):
         self.items.append(item)
 
@@ -317,6 +400,9 @@ class DEGraphWin(tk.Canvas):
         for item in self.items[:]:
             item.undraw()
             item.draw(self)
+        # keep the raster underneath everything else
+        if self.raster and self.raster.isDrawn():
+            self.tag_lower(self.raster.id)
         self.update()
 
     def toggleAxes(self):
@@ -903,7 +989,7 @@ class Entry(GraphicsObject):
         self.anchor = p.clone()
         #print self.anchor
         self.width = width
-        self.text = tk.StringVar(_root)
+        self.text = tk.StringVar(_getRoot())
         self.text.set("")
         self.fill = "gray"
         self.color = "black"
@@ -996,10 +1082,10 @@ class Image(GraphicsObject):
         self.imageId = Image.idCount
         Image.idCount = Image.idCount + 1
         if len(pixmap) == 1: # file name provided
-            self.img = tk.PhotoImage(file=pixmap[0], master=_root)
+            self.img = tk.PhotoImage(file=pixmap[0], master=_getRoot())
         else: # width and height provided
             width, height = pixmap
-            self.img = tk.PhotoImage(master=_root, width=width, height=height)
+            self.img = tk.PhotoImage(master=_getRoot(), width=width, height=height)
 
     def __repr__(self):
         return "Image({}, {}, {})".format(self.anchor, self.getWidth(), self.getHeight())
@@ -1069,6 +1155,48 @@ class Image(GraphicsObject):
         ext = name.split(".")[-1]
         self.img.write( filename, format=ext)
 
+class Raster(Image):
+
+    """A blank Image pinned to the top-left corner of the window (raw pixel
+    (0,0)) no matter what the window's coordinates are. DEGraphWin uses one
+    as the drawing surface for plotRows."""
+
+    def __init__(self, width, height):
+        Image.__init__(self, Point(0,0), width, height)
+
+    def __repr__(self):
+        return "Raster({}, {})".format(self.getWidth(), self.getHeight())
+
+    def _draw(self, canvas, options):
+        self.imageCache[self.imageId] = self.img # save a reference
+        return canvas.create_image(0,0,image=self.img,anchor="nw")
+
+    def putRows(self, rows, x=0, y=0):
+        """Sets a block of pixels in one put. rows is a list of rows of color
+        strings (or data already in Tk's "{c c ..} {c c ..}" form)"""
+        if not isinstance(rows, str):
+            rows = " ".join("{" + " ".join(row) + "}" for row in rows)
+        self.img.put(rows, to=(x, y))
+
+    def blank(self):
+        """Clears every pixel of the raster"""
+        self.img.blank()
+
+    def shift(self, dx, dy):
+        """Moves the pixels dx right and dy down, the uncovered strips are
+        left blank. (the pixels go through a second image, since tk's copy
+        isn't meant for overlapping regions of one image)"""
+        width, height = self.getWidth(), self.getHeight()
+        if abs(dx) >= width or abs(dy) >= height:
+            self.img.blank()
+            return
+        moved = tk.PhotoImage(master=_getRoot(), width=width, height=height)
+        x0, y0 = max(-dx, 0), max(-dy, 0)
+        moved.tk.call(moved.name, 'copy', self.img.name, '-from', x0, y0, x0 + width - abs(dx), y0 + height - abs(dy),
+                      '-to', max(dx, 0), max(dy, 0))
+        self.img.blank()
+        self.img.tk.call(self.img.name, 'copy', moved.name)
+
 class Button:
 
     '''A button is a labeled rectangle in a window.
@@ -1169,7 +1297,7 @@ class DropDown(GraphicsObject):
         self.anchor = p.clone()
         #print self.anchor
         self.width = width
-        self.text = tk.StringVar(_root)
+        self.text = tk.StringVar(_getRoot())
         self.text.set("")
         self.fill = "gray"
         self.color = "black"
@@ -1301,8 +1429,5 @@ def test():
 #MacOS fix 2
 #tk.Toplevel(_root).destroy()
 
-# MacOS fix 1
-update()
-
 if __name__ == "__main__":
     test()
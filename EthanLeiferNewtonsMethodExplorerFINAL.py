@@ -6,119 +6,207 @@
 from DEgraphics import *
 import cmath as cm
 import math as m
+import os
+import sys
+import time
 from NLDUtils import *
+from NewtonEngine import *
+from NewtonRender import *
+from NewtonExport import *
 
 #
 # globals
 SIZE = 400
-winNewtons = DEGraphWin(width=SIZE, height=SIZE,
-                        defCoords=[-5, -5, 5, 5], offsets=[50, 50], hasTitlebar=False,
-                        title="Newton's Method Explorer by Ethan Leifer", hBGColor="black")
 
-# below is the creation of my gui. I have seperated it into sections to make it easy to see what does what.
+# the two windows and every widget on the control pannel are made by createGUI() the first time
+# the explorer is run, so the math and rendering functions can be imported without a display
+winNewtons = None
+winCP = None
 
-# control pannel window:
-winCP = DEGraphWin(title="CONTROL PANNEL", width=400, height=380, defCoords=[0, 0, 8, 6], offsets=[450, 50], hBGColor='black')
-
-# global list to hold the roots of the respective functions
-# and their root-dots (graphical Circles) for display purposes
-roots = []
+# global list to hold the root-dots (graphical Circles) for display purposes
+# (the functions and their roots are registered in NewtonFunctions)
 rootDots = []
 dotSizeRatio = 0.01  # 1% size
 
 # epsilon value for stopping while loop
 eps = .000000001
 
+# when a point counts as done: 'distance' stops it within eps of one of the function's roots, 'step' stops it once the
+# newton step is smaller than eps (or it cycles or diverges) and only then looks for its closest root. 'certified' gives
+# the same picture as 'distance' with fewer steps (it works out the last ones near each root), but can't be resumed
+terminationMode = 'distance'
+
+# the iteration method (one of iterationMethods, picked on the control pannel) and the relaxation factor the relaxed
+# method scales the newton step by (below 1 damps it, above 1 over-relaxes it)
+iterationMethod = 'newton'
+relaxation = 1.0
+
 # color multipler to control the spread of RGB values
 multCol = 5
 
-# global list to hold colors for the various roots
-colors = [[0, 255, 0], [255, 0, 0], [0, 0, 255], [255, 255, 0], [255, 0, 255], [0, 255, 255]]
+# which of the color schemes in getColorGradient is used for the gradient
+colorScheme = '1'
+
+# number of processes used to render the fractal (1 renders in this process) and the size of the tiles
+# (in samples) that the plane is split into when rendering with more than one process
+workers = os.cpu_count() or 1
+tileSize = 64
+
+# adaptive subdivision: None computes every sample, otherwise tiles whose border all went to one root with iteration
+# counts at most adaptiveTolerance apart are filled in without computing them (faster, but not exact)
+adaptiveTolerance = None
+
+# true only computes one of the samples that are mirror images of each other when the function is symmetric
+# (like the real axis for real coefficients), the others are copied from it (see SymmetryPlan). off by default: the
+# copies start from mirrored points that can differ from the real ones by a rounding error, which changes a few
+# pixels right on the basin boundaries
+useSymmetry = False
+
+# true draws the fractal with my gradient, false with Mr. Iwanski's color scheme
+gradient = True
 
-# global list to hold function names
-functions = ["(z-1)*(z+1)", "z*(z*z-1)", "z*z*z*z-1"]
+# file the SAVE button writes the fractal to (.png or .ppm, or .nif for the raw iteration data), and how many times bigger than the window it is
+# (at 1 the frame on screen is written as it is, bigger images are computed again at the higher size)
+exportPath = "NewtonsFractal.png"
+exportScale = 1
+
+# profiling: with profileRenders on, the time spent in each stage of every render (newton steps, root search, colors,
+# drawing) and some counters are printed when it finishes, or written to profileTracePath as a chrome trace if that is set
+profileRenders = False
+profileTracePath = None
+
+# how often (in milliseconds) the window checks the background render for new samples to draw
+pollInterval = 50
+
+# how far (in pixels) the arrow keys pan the fractal window (dragging it with the mouse pans it too)
+panPixels = 40
+panKeys = {'Left': (-1, 0), 'Right': (1, 0), 'Up': (0, 1), 'Down': (0, -1)}
+
+# memory budget (in bytes) for the frames kept so zooming back to them doesn't recompute them
+cacheBytes = 64 * 1024 * 1024
 
 # global font variable to change the font of all buttons
 font = "arial"
 
-# main buttons for the control pannel below:
-btnExit = Button(win=winCP, center=Point(2, .5), width=3.8, height=.8, text="EXIT", fontSize=32, backcolor="red", fontFace=font)
-btnDraw = Button(win=winCP, center=Point(3, 1.5), width=1.8, height=.8, text="DRAW", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
-btnClear = Button(win=winCP, center=Point(1, 1.5), width=1.8, height=.8, text="CLEAR", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
-btnChangeScheme = Button(win=winCP, center=Point(3, 2.5), width=1.8, height=.8, text="SWITCH\nCOLOR\nSCHEME", fontSize=12, backcolor='blue', fontFace=font, textcolor='white')
-btnZoom = Button(win=winCP, center=Point(1, 3.5), width=1.8, height=.8, text="ZOOM", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
-btnHideShowRootDots = Button(win=winCP, center=Point(1, 2.5), width=1.8, height=.8, text="SHOW\nROOTS", fontSize=16, backcolor='blue', fontFace=font, textcolor='white')
-
-# zoom in and zoom out buttons
-btnIn = Button(win=winCP, center=Point(3, 3.75), width=1.8, height=.4, text="IN", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
-btnOut = Button(win=winCP, center=Point(3, 3.25), width=1.8, height=.4, text="OUT", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
-
-# title text object
-txtTitle = Text(Point(4, 5.5), "Newtons Method Explorer")
-txtTitle.setFace(font)
-txtTitle.setSize(30)
-txtTitle.draw(winCP)
-
-
-# maximum iterations entry object
-entIters = Entry(Point(5, .25,), 10)
-entIters.draw(winCP)
-entIters.setText("")
-entIters.setFace(font)
-btnEnterIters = Button(winCP, center=Point(7.25, .5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
-txtIters = Text(Point(5.25, .75), "Max Iterations = ")
-txtIters.setFace(font)
-txtIters.draw(winCP)
-
-
-# number of sweeps entry object
-entSweeps = Entry(Point(5, 1.25,), 10)
-entSweeps.draw(winCP)
-entSweeps.setText("")
-entSweeps.setFace(font)
-btnEnterSweeps = Button(winCP, center=Point(7.25, 1.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
-txtSweeps = Text(Point(5.25, 1.75), "Sweeps = ")
-txtSweeps.setFace(font)
-txtSweeps.draw(winCP)
-
-# resulotion entry object
-entResolution = Entry(Point(5, 2.25,), 10)
-entResolution.draw(winCP)
-entResolution.setText("")
-entResolution.setFace(font)
-btnEnterResolution = Button(winCP, center=Point(7.25, 2.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
-txtResolution = Text(Point(5.25, 2.75), "Resolution = ")
-txtResolution.setFace(font)
-txtResolution.draw(winCP)
-
-# color multipler entry object
-entColorMult = Entry(Point(5, 3.25,), 10)
-entColorMult.draw(winCP)
-entColorMult.setText("")
-entColorMult.setFace(font)
-btnEnterColorMult = Button(winCP, center=Point(7.25, 3.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
-txtColorMult = Text(Point(5.25, 3.75), "Color Multiplier = ")
-txtColorMult.setFace(font)
-txtColorMult.draw(winCP)
-
-# epsilon entry object
-entEpsilon = Entry(Point(5, 4.25,), 10)
-entEpsilon.draw(winCP)
-entEpsilon.setText("")
-entEpsilon.setFace(font)
-btnEnterEpsilon = Button(winCP, center=Point(7.25, 4.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
-txtEpsilon = Text(Point(5.25, 4.75), "Epsilon = ")
-txtEpsilon.setFace(font)
-txtEpsilon.draw(winCP)
-
-
-# change buttons and current function text object
-reformattedFunctions = ["1. " + str(functions[0]), "2. " + str(functions[1]), "3. " + str(functions[2])]
-txtCurrentFunction = Text(Point(2, 4.75), "Current Function = ")
-txtCurrentFunction.draw(winCP)
-drpFcn = DropDown(Point(1, 4.25), width=7, choices=reformattedFunctions)
-drpFcn.draw(winCP)
-btnFcnEnter = Button(winCP, center=Point(3, 4.25), width=1.8, height=.4, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+
+def createGUI():
+    """creates the newtons window and the control pannel with all of its buttons, entries and text"""
+    global winNewtons, winCP
+    global btnExit, btnSave, btnDraw, btnClear, btnChangeScheme, btnZoom, btnHideShowRootDots, btnIn, btnOut
+    global entIters, btnEnterIters, txtIters, entSweeps, btnEnterSweeps, txtSweeps
+    global entResolution, btnEnterResolution, txtResolution, entColorMult, btnEnterColorMult, txtColorMult
+    global entEpsilon, btnEnterEpsilon, txtEpsilon, txtCurrentFunction, drpFcn, btnFcnEnter
+    global txtMethod, drpMethod, btnMethodEnter, entRelaxation, btnEnterRelaxation, txtRelaxation, txtStats
+
+    winNewtons = DEGraphWin(width=SIZE, height=SIZE,
+                            defCoords=[-5, -5, 5, 5], offsets=[50, 50], hasTitlebar=False,
+                            title="Newton's Method Explorer by Ethan Leifer", hBGColor="black")
+
+    # below is the creation of my gui. I have seperated it into sections to make it easy to see what does what.
+
+    # control pannel window:
+    winCP = DEGraphWin(title="CONTROL PANNEL", width=400, height=443, defCoords=[0, 0, 8, 7], offsets=[450, 50], hBGColor='black')
+
+    # main buttons for the control pannel below:
+    btnExit = Button(win=winCP, center=Point(1, .5), width=1.8, height=.8, text="EXIT", fontSize=25, backcolor="red", fontFace=font)
+    btnSave = Button(win=winCP, center=Point(3, .5), width=1.8, height=.8, text="SAVE", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
+    btnDraw = Button(win=winCP, center=Point(3, 1.5), width=1.8, height=.8, text="DRAW", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
+    btnClear = Button(win=winCP, center=Point(1, 1.5), width=1.8, height=.8, text="CLEAR", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
+    btnChangeScheme = Button(win=winCP, center=Point(3, 2.5), width=1.8, height=.8, text="SWITCH\nCOLOR\nSCHEME", fontSize=12, backcolor='blue', fontFace=font, textcolor='white')
+    btnZoom = Button(win=winCP, center=Point(1, 3.5), width=1.8, height=.8, text="ZOOM", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
+    btnHideShowRootDots = Button(win=winCP, center=Point(1, 2.5), width=1.8, height=.8, text="SHOW\nROOTS", fontSize=16, backcolor='blue', fontFace=font, textcolor='white')
+
+    # zoom in and zoom out buttons
+    btnIn = Button(win=winCP, center=Point(3, 3.75), width=1.8, height=.4, text="IN", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
+    btnOut = Button(win=winCP, center=Point(3, 3.25), width=1.8, height=.4, text="OUT", fontSize=25, backcolor='blue', fontFace=font, textcolor='white')
+
+    # title text object
+    txtTitle = Text(Point(4, 6.6), "Newtons Method Explorer")
+    txtTitle.setFace(font)
+    txtTitle.setSize(30)
+    txtTitle.draw(winCP)
+
+
+    # maximum iterations entry object
+    entIters = Entry(Point(5, .25,), 10)
+    entIters.draw(winCP)
+    entIters.setText("")
+    entIters.setFace(font)
+    btnEnterIters = Button(winCP, center=Point(7.25, .5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+    txtIters = Text(Point(5.25, .75), "Max Iterations = ")
+    txtIters.setFace(font)
+    txtIters.draw(winCP)
+
+
+    # number of sweeps entry object
+    entSweeps = Entry(Point(5, 1.25,), 10)
+    entSweeps.draw(winCP)
+    entSweeps.setText("")
+    entSweeps.setFace(font)
+    btnEnterSweeps = Button(winCP, center=Point(7.25, 1.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+    txtSweeps = Text(Point(5.25, 1.75), "Sweeps = ")
+    txtSweeps.setFace(font)
+    txtSweeps.draw(winCP)
+
+    # resulotion entry object
+    entResolution = Entry(Point(5, 2.25,), 10)
+    entResolution.draw(winCP)
+    entResolution.setText("")
+    entResolution.setFace(font)
+    btnEnterResolution = Button(winCP, center=Point(7.25, 2.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+    txtResolution = Text(Point(5.25, 2.75), "Resolution = ")
+    txtResolution.setFace(font)
+    txtResolution.draw(winCP)
+
+    # color multipler entry object
+    entColorMult = Entry(Point(5, 3.25,), 10)
+    entColorMult.draw(winCP)
+    entColorMult.setText("")
+    entColorMult.setFace(font)
+    btnEnterColorMult = Button(winCP, center=Point(7.25, 3.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+    txtColorMult = Text(Point(5.25, 3.75), "Color Multiplier = ")
+    txtColorMult.setFace(font)
+    txtColorMult.draw(winCP)
+
+    # epsilon entry object
+    entEpsilon = Entry(Point(5, 4.25,), 10)
+    entEpsilon.draw(winCP)
+    entEpsilon.setText("")
+    entEpsilon.setFace(font)
+    btnEnterEpsilon = Button(winCP, center=Point(7.25, 4.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+    txtEpsilon = Text(Point(5.25, 4.75), "Epsilon = ")
+    txtEpsilon.setFace(font)
+    txtEpsilon.draw(winCP)
+
+
+    # change buttons and current function text object
+    reformattedFunctions = [str(i + 1) + ". " + str(functions[i]) for i in getMenuFunctions()]
+    txtCurrentFunction = Text(Point(2, 4.75), "Current Function = ")
+    txtCurrentFunction.draw(winCP)
+    drpFcn = DropDown(Point(1, 4.25), width=7, choices=reformattedFunctions)
+    drpFcn.draw(winCP)
+    btnFcnEnter = Button(winCP, center=Point(3, 4.25), width=1.8, height=.4, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+
+    # iteration method drop down and relaxation factor entry object
+    txtMethod = Text(Point(2, 5.75), "Method = ")
+    txtMethod.draw(winCP)
+    drpMethod = DropDown(Point(1, 5.25), width=7, choices=list(iterationMethods))
+    drpMethod.draw(winCP)
+    btnMethodEnter = Button(winCP, center=Point(3, 5.25), width=1.8, height=.4, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+    entRelaxation = Entry(Point(5, 5.25,), 10)
+    entRelaxation.draw(winCP)
+    entRelaxation.setText("")
+    entRelaxation.setFace(font)
+    btnEnterRelaxation = Button(winCP, center=Point(7.25, 5.5), width=1.25, height=.8, text="Enter", fontSize=15, backcolor='blue', fontFace=font, textcolor='white')
+    txtRelaxation = Text(Point(5.25, 5.75), "Relaxation = ")
+    txtRelaxation.setFace(font)
+    txtRelaxation.draw(winCP)
+
+    # how fast the method converged on the last frame
+    txtStats = Text(Point(4, 6.15), "")
+    txtStats.setFace(font)
+    txtStats.setSize(10)
+    txtStats.draw(winCP)
 
 # these functions and variables make it easy to activate, deactive and update text elements on my GUI
 mainBtnsActive = False
@@ -132,6 +220,7 @@ def changeActivityMainBtns():
 
     if mainBtnsActive:
         btnExit.deactivate()
+        btnSave.deactivate()
         btnDraw.deactivate()
         btnClear.deactivate()
         btnChangeScheme.deactivate()
@@ -143,8 +232,11 @@ def changeActivityMainBtns():
         btnFcnEnter.deactivate()
         btnEnterColorMult.deactivate()
         btnEnterEpsilon.deactivate()
+        btnMethodEnter.deactivate()
+        btnEnterRelaxation.deactivate()
     else:
         btnExit.activate()
+        btnSave.activate()
         btnDraw.activate()
         btnClear.activate()
         btnChangeScheme.activate()
@@ -156,6 +248,8 @@ def changeActivityMainBtns():
         btnFcnEnter.activate()
         btnEnterColorMult.activate()
         btnEnterEpsilon.activate()
+        btnMethodEnter.activate()
+        btnEnterRelaxation.activate()
 
     mainBtnsActive = not(mainBtnsActive)
 
@@ -180,131 +274,13 @@ def updateTextBoxes(maxIters, sweeps, resolution, fcn):
     txtCurrentFunction.setText("Current Function = " + str(functions[fcn]))
     txtEpsilon.setText("Epsilon = " + str(eps))
     txtColorMult.setText("Color Multiplier = " + str(multCol))
+    txtMethod.setText("Method = " + iterationMethod)
+    txtRelaxation.setText("Relaxation = " + str(relaxation))
 
-def f(z, whichFunction=0):
-    """f(z)"""
-    if whichFunction == 0:
-        return (z - 1) * (z + 1)
-
-    elif whichFunction == 1:
-        return z * (z - 1) * (z + 1)
-
-    elif whichFunction == 2:
-        return z * z * z * z - 1
-
-def fprime(z, whichFunction=0):
-    """f'(z)"""
-    if whichFunction == 0:
-        return 2.0 * z
-
-    elif whichFunction == 1:
-        return 3.0 * z * z - 1.0
-
-    elif whichFunction == 2:
-        return 4.0 * z * z * z
-
-def newtons(z, fcn, numIters):
-    """iterates newtons root-finding algorithm for specified function"""
-    for n in range(numIters):
-        z = z - f(z, fcn) / fprime(z, fcn)
-    return z
-
-def newtonsNumIters(z, fcn, maxIters, epsilon=.01):
-    """iterates newtons root-finding algorithm for specified function while the distance between the closest root and z is greater then epsilon"""
-    numIters = 0
-    while maxIters > numIters and epsilon < getDistanceOfCloseRoot(z, roots[fcn]):
-        # iterate z if condition fails
-        z = z - (f(z, fcn) / fprime(z, fcn))
-        numIters += 1
-    return (z, numIters)
-
-def getColorGradient(z, fcn, numIters, maxIters, colorscheme='1'):
-    """returns a color scheme based on the number of iterations"""
-    # note: I was going to add the ability to add different color schemes but I realized that this one is the best. You can change it by changing the default color scheme in the function if you want.
-    if colorscheme == '1':
-        # get the color of the close root
-        closeRoot = getCloseRootIndex(z, roots[fcn])
-        rootColor = colors[closeRoot]
-        color = [0, 0, 0]  # THIS IS THE FINAL COLOR
-        # go through each rgb value
-        for i in range(3):
-            # this transformation:
-                # if rootColor[i] is 0 then the whole thing will stay 0, otherwise it will scale to 255
-                # multCol expands the distance between each color
-                # 255 - ... inverts the color scheme
-            color[i] = (255 - abs(int(numIters / maxIters * multCol * rootColor[i]))) % 255
-        return color_rgb(color[0], color[1], color[2])
-
-    # THESE ARE OTHER COLOR SCHEMES I DEVELOPED (MOST ARE GRAYSCALES BUT WORTH A LOOK) (most are similar to the one above)
-    if colorscheme == '2':
-        color = colors[getCloseRootIndex(z, roots[fcn])]
-        for i in range(3):
-            color[i] = (int(255 - float(numIters) / maxIters * 10000)) % 255  # gradient from light to dark
-        return color_rgb(color[0], color[1], color[2])
-
-    if colorscheme == '3':
-        # THIS IS AN AMAZING GRAYSCALE!!!
-        color = colors[getCloseRootIndex(z, roots[fcn])]
-        for i in range(3):
-            color[i] = (255 - numIters) * 10 % 255
-        return color_rgb(color[0], color[1], color[2])
-
-    if colorscheme == '4':
-        color2 = colors[getCloseRootIndex(z, roots[fcn])]
-        color = [0, 0, 0]  # new color
-        for i in range(3):
-            if color2[i] == 255:
-                color[i] = abs((color2[i] - (numIters * 10000 % 255)) % 255)
-        return color_rgb(color[0], color[1], color[2])
-
-    if colorscheme == '5':
-        color2 = colors[getCloseRootIndex(z, roots[fcn])]
-        color = [0, 0, 0]  # new color
-        for i in range(3):
-            # if color2[i] == 255:
-                color[i] = int((float(numIters) / maxIters) * 10000) % 255
-        return color_rgb(color[0], color[1], color[2])
-
-    if colorscheme == '6':
-        color2 = colors[getCloseRootIndex(z, roots[fcn])]
-        color = [0, 0, 0]  # new color
-        for i in range(3):
-            color[i] = abs(int((((color2[i] * multCol) / maxIters) * multCol * numIters + color2[i]) % 255))
-        return color_rgb(color[0], color[1], color[2])
-
-def getDistanceOfCloseRoot(z, rootList):
-    """returns the distance of the closet root to z"""
-    closeRoot = 0
-    minD = abs(z - rootList[closeRoot])
-    for rootNum in range(1, len(rootList)):
-        d = abs(z - rootList[rootNum])
-        if d < minD:
-            minD = d
-            closeRoot = rootNum
-    return minD
-
-def getCloseRootIndex(z, rootList):
-    """returns the index of the closet root to z"""
-    closeRoot = 0
-    minD = abs(z - rootList[closeRoot])
-    for rootNum in range(0, len(rootList)):
-        d = abs(z - rootList[rootNum])
-        if d < minD:
-            minD = d
-            closeRoot = rootNum
-    return closeRoot
-
-def getColorOfCloseRoot(z, rootList):
-    """returns the color of the closet root to z"""
-    closeRoot = 0
-    minD = abs(z - rootList[closeRoot])
-    for rootNum in range(0, len(rootList)):
-        d = abs(z - rootList[rootNum])
-        if d < minD:
-            minD = d
-            closeRoot = rootNum
-    color = colors[closeRoot]
-    return color_rgb(color[0], color[1], color[2])
+def updateConvergenceStats(result):
+    """shows the mean number of iterations per sample of a finished frame and the fraction of its samples that didn't converge"""
+    meanIters, notConverged = getConvergenceStats(result.iters, result.maxIters)
+    txtStats.setText("{}: {:.2f} iterations per sample, {:.2%} not converged".format(getFunction(result.fcn).getMethodName(), meanIters, notConverged))
 
 def displayRoots():
     """display root dots"""
@@ -323,53 +299,229 @@ def generateRootDots(rootList):
     global rootDots
     for i in range(len(rootList)):
         dot = Circle(Point(rootList[i].real, rootList[i].imag), dotSizeRatio * (winNewtons.currentCoords[2] - winNewtons.currentCoords[0]))
-        color = colors[i]
+        color = getRootColor(i)
         dot.setFill(color_rgb(color[0], color[1], color[2]))
         dot.setOutline("black")
         rootDots.append(dot)
 
-def generateNewtonFractal(fcn, numIters, rootList, resolution=3, numSweeps=4, gradient=True):
-    """generates the NewtonsFractal"""
+def generateNewtonFractal(fcn, numIters, rootList, resolution=3, numSweeps=4, preview=None, onDone=None):
+    """starts generating the NewtonsFractal on a background thread and returns (result, job): the RenderResult that
+    the samples are stored in as they arrive, and the RenderJob computing them (cancel it to stop the render).
+    preview is an optional RenderResult that covers this frame, it is resampled and drawn first while the frame computes.
+    onDone(result) is called on the main thread once every sample is in"""
     global rootDots
 
-    # define screen settings parameters
-    rm = winNewtons.currentCoords[0]
-    im = winNewtons.currentCoords[1]
-    rM = winNewtons.currentCoords[2]
-    iM = winNewtons.currentCoords[3]
-    rstep = resolution * (rM - rm) / winNewtons.width
-    istep = resolution * (iM - im) / winNewtons.height
+    if profileRenders:
+        startProfile("generateNewtonFractal", trace=profileTracePath is not None)
 
     # clear the window (erase it)
     winNewtons.clear()
 
-    # define custom width for dot-size
-    screenW = rM - rm
-
     # define the actual dots
     generateRootDots(rootList)
 
     # generates the fractal
     maxIters = numIters
-    for sweep in range(numSweeps):
-        r = rm + sweep * rstep
-        while r < rM:
-            i = im
-            while i < iM:
-                z = complex(r, i)
-                # if gradient is true it will graph the newtons fractal using my graident
-                if gradient:
-                    result = newtonsNumIters(z, fcn, maxIters, epsilon=eps)
-                    z = result[0]
-                    numIters = result[1]
-                    winNewtons.plot(r, i, getColorGradient(z, fcn, numIters, maxIters, colorscheme='1'))
-                # use Mr. Iwanski's color scheme
-                else:
-                    z = newtons(z, fcn, maxIters)
-                    winNewtons.plot(r, i, getColorOfCloseRoot(z, rootList))
-                i += istep
-            r += rstep * numSweeps
-            winNewtons.update()
+    coords = winNewtons.currentCoords
+
+    # show the frame this one was zoomed in from, stretched to fit, until the real samples are drawn over it
+    if preview is not None:
+        rValues, iValues = getPlaneAxes(coords, winNewtons.width, winNewtons.height, resolution)
+        rootIndex, iters = preview.resample(rValues, iValues)
+        plotSamples(getSampleColors(fcn, rootIndex, iters, preview.maxIters, gradient), 0, 0, resolution)
+        winNewtons.update()
+
+    rValues, iValues = getPlaneAxes(coords, winNewtons.width, winNewtons.height, resolution)
+    result = RenderResult(len(iValues), len(rValues), coords, fcn, maxIters, eps, winNewtons.width, winNewtons.height, resolution, mode=terminationMode)
+    result.complete = False
+    result.exact = adaptiveTolerance is None
+    result.symmetry = useSymmetry
+    plan = getSymmetryPlan(fcn, rValues, iValues) if useSymmetry else None
+    if adaptiveTolerance is not None:
+        # adaptive render: only the tiles along basin boundaries are computed all the way down
+        mode = 'adaptive'
+        render = renderAdaptive(rValues, iValues, fcn, maxIters, eps, adaptiveTolerance, mode=terminationMode, workers=workers)
+    elif numSweeps <= 1:
+        # split the plane into tiles (computed in parallel with more than one worker) and draw each one as it finishes
+        mode = 'tiles'
+        if plan is not None:
+            render = renderSymmetric(rValues, iValues, fcn, maxIters, eps, workers, tileSize, terminationMode, plan)
+        else:
+            render = renderTiles(rValues, iValues, fcn, maxIters, eps, workers, tileSize, terminationMode)
+    else:
+        # progressive render: each sweep halves the block size, starting with 2^(numSweeps-1) sample wide blocks,
+        # and only computes the samples the sweeps before it haven't
+        mode = 'progressive'
+        render = renderProgressive(rValues, iValues, fcn, maxIters, eps, numSweeps, workers, mode=terminationMode, plan=plan)
+
+    # the samples are computed on a background thread and drawn here, on the main thread, as they arrive
+    job = RenderJob(render).start()
+    job.profile = getProfile()
+    winNewtons.after(pollInterval, pollRenderJob, job, result, mode, onDone)
+    return result, job
+
+def resumeNewtonFractal(source, numIters, onDone=None):
+    """like generateNewtonFractal, but carries the finished frame source on to numIters iterations and the current eps
+    (see canResume) instead of starting over, so only the samples that haven't converged yet are iterated.
+    returns (result, job), result is a new RenderResult and source is left as it was"""
+    if profileRenders:
+        startProfile("resumeNewtonFractal", trace=profileTracePath is not None)
+
+    # the converged samples are already right, so the old frame is drawn while the rest is carried on
+    redrawNewtonFractal(source, gradient)
+    generateRootDots(roots[source.fcn])
+
+    result = getResumedResult(source, numIters, eps)
+    result.complete = False
+    job = RenderJob(renderResume(source, numIters, eps, workers)).start()
+    job.profile = getProfile()
+    winNewtons.after(pollInterval, pollRenderJob, job, result, 'resume', onDone)
+    return result, job
+
+def panNewtonFractal(source, dCols, dRows, cache=None, onDone=None):
+    """moves the finished frame source dCols samples right and dRows samples up: the pixels that stay in view are shifted
+    and only the samples uncovered are computed (or copied from frames in cache that line up with it).
+    returns (result, job) like generateNewtonFractal"""
+    if profileRenders:
+        startProfile("panNewtonFractal", trace=profileTracePath is not None)
+
+    result, known = getPannedResult(source, dCols, dRows)
+    winNewtons.setCoords(*result.coords)
+    winNewtons.shiftPixels(-dCols * source.resolution, dRows * source.resolution)
+
+    result.complete = False
+    sources = cache.getAligned(result) if cache is not None else []
+    job = RenderJob(renderPan(result, known, sources, workers, tileSize)).start()
+    job.profile = getProfile()
+    winNewtons.after(pollInterval, pollRenderJob, job, result, 'tiles', onDone)
+    return result, job
+
+def pollRenderJob(job, result, mode, onDone=None):
+    """draws whatever the render job has computed since the last poll, and polls again until it is finished (tk after callback)"""
+    if job.isCancelled() or winNewtons.isClosed():
+        if job.profile is not None and getProfile() is job.profile:
+            stopProfile()
+        return
+    profile = getProfile()
+    if profile is not None:
+        startTime = time.perf_counter()
+    drawRenderItems(result, mode, job.getItems())
+    if profile is not None:
+        profile.add('poll', startTime)
+    if job.finished:
+        result.complete = True
+        if job.profile is not None and getProfile() is job.profile:
+            reportProfile(stopProfile(), result)
+        updateConvergenceStats(result)
+        if onDone is not None:
+            onDone(result)
+    elif not job.isCancelled():
+        winNewtons.after(pollInterval, pollRenderJob, job, result, mode, onDone)
+
+def drawRenderItems(result, mode, items):
+    """stores the items a render job yielded in result and draws them (mode is 'tiles', 'progressive', 'adaptive' or 'resume')"""
+    if not items:
+        return
+    fcn, maxIters, resolution = result.fcn, result.maxIters, result.resolution
+    if mode == 'tiles':
+        for row0, col0, z, iters, rootIndex in items:
+            result.setSamples(row0, col0, z, iters, rootIndex)
+            plotSamples(getSampleColors(fcn, rootIndex, iters, maxIters, gradient), row0, col0, resolution)
+
+    elif mode == 'progressive':
+        for step, passDone, rows, cols, z, iters, rootIndex in items:
+            result.setPoints(rows, cols, z, iters, rootIndex)
+            if passDone:
+                # if gradient is true it will graph the newtons fractal using my graident, otherwise Mr. Iwanski's color scheme
+                colorArray = getSampleColors(fcn, getCoarseSamples(result.rootIndex, step), getCoarseSamples(result.iters, step), maxIters, gradient)
+                plotSamples(colorArray, 0, 0, resolution)
+
+    elif mode == 'adaptive':
+        for computed, rows, cols, z, iters, rootIndex in items:
+            result.setPoints(rows, cols, z, iters, rootIndex)
+        plotSamples(getSampleColors(fcn, result.rootIndex, result.iters, maxIters, gradient), 0, 0, resolution)
+
+    elif mode == 'resume':
+        for rows, cols, z, iters, rootIndex in items:
+            result.setPoints(rows, cols, z, iters, rootIndex)
+        plotSamples(getSampleColors(fcn, result.rootIndex, result.iters, maxIters, gradient), 0, 0, resolution)
+
+def reportProfile(profile, result):
+    """adds the counters of the finished render to its profile and prints it (or writes it to profileTracePath)"""
+    profile.addResult(result.rootIndex, result.iters, result.maxIters)
+    if profileTracePath is not None:
+        profile.writeTrace(profileTracePath)
+        print("wrote " + profileTracePath)
+    else:
+        print(profile.getSummary())
+
+def redrawNewtonFractal(result, gradient=True):
+    """draws an already computed RenderResult again with the current colors, without running any newton iterations"""
+    winNewtons.clear()
+    plotSamples(getSampleColors(result.fcn, result.rootIndex, result.iters, result.maxIters, gradient), 0, 0, result.resolution)
+    winNewtons.update()
+
+def getSampleColors(fcn, rootIndex, iters, maxIters, gradient=True):
+    """returns an array of the color string of every sample, using the current color scheme and multCol"""
+    return getPalette(len(roots[fcn]), maxIters, colorScheme, multCol, gradient).getColorStrings(rootIndex, iters)
+
+def plotSamples(colorArray, row0, col0, resolution):
+    """draws a tile of sample colors (bottom-left sample (row0, col0)) into winNewtons with one bulk put.
+    returns false if the tile is off the window"""
+    profile = getProfile()
+    if profile is not None:
+        startTime = time.perf_counter()
+        profile.count('draw calls')
+    block, x, y = getTileBlock(colorArray, row0, col0, winNewtons.width, winNewtons.height, resolution)
+    if block is None:
+        return False
+    winNewtons.plotRows(block.tolist(), x, y)
+    if profile is not None:
+        profile.add('draw', startTime)
+    return True
+
+def saveNewtonFractal(result, gradient=True):
+    """writes the fractal on screen to exportPath, exportScale times the size of the window.
+    if exportPath ends in .nif the iteration data is saved instead (python EthanLeiferNewtonsMethodExplorerFINAL.py file.nif shows it again)"""
+    if exportPath.lower().endswith('.nif'):
+        if not result.complete:
+            print("the fractal is still rendering, save it once it's done")
+            return
+        saveIterationField(exportPath, result)
+    elif exportScale == 1 and result.complete:
+        exportResult(exportPath, result, colorScheme, multCol, gradient)
+    else:
+        exportNewtonFractal(exportPath, result.coords, result.fcn, result.maxIters, result.epsilon, colorScheme,
+                            result.width * exportScale, result.height * exportScale, result.resolution, gradient, multCol, workers, mode=result.mode)
+    print("saved " + exportPath)
+
+def getInput(resolution):
+    """waits for a click on the control pannel, an arrow key, or a drag on the fractal window. returns (clickPoint, pan):
+    the point clicked (for a pan, a point off the pannel so no button counts as clicked) and the (dCols, dRows) samples
+    to pan by (None for a click)"""
+    noClick = Point(-1, -1)
+    step = max(1, panPixels // resolution)
+    # a drag left over from before (like one while picking a zoom corner) isn't a pan
+    winNewtons.checkDrag()
+    while True:
+        # the checks pump the tk events, which is also when the render job is polled (so 'tk events' includes 'poll')
+        profile = getProfile()
+        startTime = time.perf_counter()
+        clickPoint = winCP.checkMouse()
+        # (the windows share one key binding, so either one can have the key. the arrow keys only pan when the
+        # fractal window has the focus, otherwise they are moving the cursor in an entry box on the control pannel)
+        key = winCP.checkKey() or winNewtons.checkKey()
+        drag = winNewtons.checkDrag()
+        if profile is not None:
+            profile.add('tk events', startTime)
+        if clickPoint is not None:
+            return clickPoint, None
+        if key in panKeys and winNewtons.hasFocus():
+            return noClick, (panKeys[key][0] * step, panKeys[key][1] * step)
+        if drag is not None and (abs(drag[0]) >= resolution or abs(drag[1]) >= resolution):
+            # the fractal follows the mouse, so dragging right moves the view left
+            return noClick, (-int(round(drag[0] / resolution)), int(round(drag[1] / resolution)))
+        time.sleep(.05)
 
 def zoom(hasZoomedIn):
     """zoom in or out on the newtons graph window"""
@@ -379,11 +531,13 @@ def zoom(hasZoomedIn):
 
     clickPoint = winCP.getMouse()
 
+    # hasZoomed is true if the window was erased and moved to new coordinates
+    hasZoomed = False
     if btnIn.clicked(clickPoint):
-        winNewtons.zoom('in')
+        hasZoomed = winNewtons.zoom('in')
 
     if btnOut.clicked(clickPoint):
-        winNewtons.zoom('out')
+        hasZoomed = winNewtons.zoom('out')
 
     # if the user doesnt click on either button it puts the user back onto main options menu. I did this because I wanted user to be able to cancel zoom
 
@@ -391,16 +545,19 @@ def zoom(hasZoomedIn):
     if zoomBtnsActive:
         changeActivityZoomBtns()
 
-def main():
-    global winNewtons, roots, multCol, eps
+    return hasZoomed
 
-    # append roots of functions
-    #   0. roots of (z-1)(z+1)
-    roots.append([complex(1, 0), complex(-1, 0)])
-    #   1. roots of z(z-1)(z+1)
-    roots.append([complex(0, 0), complex(1, 0), complex(-1, 0)])
-    #   2. roots of z^4 - 1
-    roots.append([complex(1, 0), complex(-1, 0), complex(0, 1), complex(0, -1)])
+def main(fieldPath=None):
+    """runs the explorer. fieldPath is an optional .nif file (saved iteration data) to start on, it is shown without computing it again"""
+    global winNewtons, roots, multCol, eps, gradient, terminationMode, iterationMethod, relaxation, useSymmetry
+
+    # load the saved frame first, so a function that isn't built in gets registered before the function menu is made
+    field = None
+    if fieldPath is not None:
+        field = loadIterationField(fieldPath)
+
+    # create the windows (this is the first time Tk is needed)
+    createGUI()
 
     # choose function and store its roots in currRoots
     myFcn = 2
@@ -410,8 +567,18 @@ def main():
     iterations = 100
     resolution = 1
     sweeps = 4
+
+    # start on the saved frame's settings
+    if field is not None:
+        myFcn, iterations, resolution, eps, terminationMode = field.fcn, field.maxIters, field.resolution, field.epsilon, field.mode
+        useSymmetry = field.symmetry
+        # the menu has the newtons method functions, the method is picked separately
+        iterationMethod, relaxation = getFunction(myFcn).method, getFunction(myFcn).relaxation
+        myFcn = getMethodFunction(myFcn)
+        currRoots = roots[myFcn]
+        winNewtons.setCoords(*field.coords)
+
     winCP.displayGrid()
-    gradient = True
     hasZoomedIn = False
 
     changeActivityMainBtns()
@@ -420,19 +587,41 @@ def main():
     clickPoint = winCP.getMouse()
 
     clickPoint = winCP.getMouse()
+    pan = None
+
+    # keeps track of what is on screen so the fractal is only recomputed (or recolored) when it would change
+    scheduler = RenderScheduler()
+    # the frames computed so far, so zooming back out (or in again) to one of them only recolors it
+    cache = ViewportCache(cacheBytes)
+    if field is not None:
+        # a frame saved at another size is resampled to the window, so it is still shown without computing it
+        if (field.width, field.height) != (winNewtons.width, winNewtons.height):
+            field = getResizedResult(field, winNewtons.width, winNewtons.height)
+        # (the same keys as params below, for RenderScheduler.computeKeys)
+        cache.put({'coords': tuple(winNewtons.currentCoords), 'fcn': field.fcn, 'maxIters': iterations, 'epsilon': eps,
+                   'mode': terminationMode, 'resolution': resolution, 'width': winNewtons.width, 'height': winNewtons.height,
+                   'symmetry': useSymmetry}, field)
 
     while not(btnExit.clicked(clickPoint)):
 
-        generateNewtonFractal(myFcn, iterations, currRoots, resolution, sweeps, gradient)
-
         if btnClear.clicked(clickPoint):
+            scheduler.cancel()
             winNewtons.clear()
+            scheduler.clear()
+
+        if btnDraw.clicked(clickPoint):
+            scheduler.draw()
+
+        if btnSave.clicked(clickPoint) and scheduler.result is not None:
+            saveNewtonFractal(scheduler.result, gradient)
 
         if btnChangeScheme.clicked(clickPoint):
             gradient = not(gradient)
 
         if btnZoom.clicked(clickPoint):
             hasZoomedIn = zoom(hasZoomedIn)
+            if hasZoomedIn:
+                scheduler.invalidate()
 
         # change maximum iterations
         if btnEnterIters.clicked(clickPoint):
@@ -481,16 +670,70 @@ def main():
             btnHideShowRootDots.caption.setFace(font)
 
         if btnFcnEnter.clicked(clickPoint):
-            myFcn = int(drpFcn.getOption()[0]) - 1
+            myFcn = int(drpFcn.getOption().split(".")[0]) - 1
+            currRoots = roots[myFcn]
+
+        # change the iteration method
+        if btnMethodEnter.clicked(clickPoint):
+            iterationMethod = drpMethod.getOption()
+
+        # change the relaxation factor of the relaxed method
+        if btnEnterRelaxation.clicked(clickPoint):
+            if isValidBetween(type(1.0), [0, 2], entRelaxation.getText()):
+                relaxation = float(entRelaxation.getText())
+            entRelaxation.setText("")
+
+        # pan: the frame on screen is shifted and only the samples it uncovers are computed
+        panned = None
+        if pan is not None:
+            source = scheduler.result
+            if source is not None and source.complete and scheduler.drawn and source.resolution == resolution \
+               and list(source.coords) == list(winNewtons.currentCoords):
+                scheduler.cancel()
+                panned = panNewtonFractal(source, pan[0], pan[1], cache, lambda result: cache.put(result.getParams(), result))
+            else:
+                # nothing finished to shift, so the moved frame is just rendered
+                winNewtons.setCoords(*getPanCoords(winNewtons.currentCoords, winNewtons.width, winNewtons.height, resolution, *pan))
 
         updateTextBoxes(iterations, sweeps, resolution, myFcn)
+        # each method is a function of its own (with the same roots), so the frames of every method are cached apart
+        methodFcn = getMethodFunction(myFcn, iterationMethod, relaxation)
+
+        # only recompute when the iteration data would change, and only recolor when just the colors would
+        params = {'coords': tuple(winNewtons.currentCoords), 'fcn': methodFcn, 'maxIters': iterations, 'epsilon': eps,
+                  'mode': terminationMode, 'resolution': resolution, 'gradient': gradient, 'width': winNewtons.width, 'height': winNewtons.height,
+                  'symmetry': useSymmetry, 'multCol': multCol, 'colorScheme': colorScheme}
+        if panned is not None:
+            scheduler.update(params, *panned)
+        elif scheduler.needsCompute(params):
+            # a new frame is wanted, so whatever is still rendering the old one is stopped straight away
+            scheduler.cancel()
+            result = cache.get(params)
+            resumable = cache.getResumable(params)
+            if result is not None:
+                redrawNewtonFractal(result, gradient)
+                updateConvergenceStats(result)
+                scheduler.update(params, result)
+            elif resumable is not None:
+                # only the iterations or epsilon went up (or down), so the samples that haven't converged are carried on
+                result, job = resumeNewtonFractal(resumable, iterations, lambda result, params=params: cache.put(params, result))
+                scheduler.update(params, result, job)
+            else:
+                # the finished frame goes in the cache (the render runs in the background while this loop waits for clicks)
+                result, job = generateNewtonFractal(methodFcn, iterations, currRoots, resolution, sweeps, cache.getParent(params),
+                                                    lambda result, params=params: cache.put(params, result))
+                scheduler.update(params, result, job)
+        elif scheduler.needsRedraw(params):
+            redrawNewtonFractal(scheduler.result, gradient)
+            scheduler.update(params)
 
-        clickPoint = winCP.getMouse()
+        clickPoint, pan = getInput(resolution)
 
+    scheduler.cancel()
     print("closing windows")
     winNewtons.close()
     winCP.close()
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,141 @@
+# NewtonBatch.py
+# renders newtons fractals from the command line, without opening any windows.
+#
+#   python NewtonBatch.py --function 3 --coords -5 -5 5 5 --size 1600 1600 --iters 100 --out z4.png
+#   python NewtonBatch.py --function "z*z*z - 1" --out cube.ppm
+#   python NewtonBatch.py --function 3 --method halley --out z4halley.png
+#   python NewtonBatch.py --jobs atlas.json
+#
+# a job file is a json list of jobs, each one a dictionary with any of the option names below
+# (like {"function": "3", "coords": [-1, -1, 1, 1], "out": "zoom.png"}). options given on the
+# command line are the defaults for every job. all the jobs run in one process, so the process
+# pool, the compiled functions and the color palettes are only set up once.
+
+# imports
+import argparse
+import json
+import sys
+import time
+from NewtonExport import *
+
+
+# functions given on the command line (or in a job file) as expressions or coefficients, so each is only compiled once
+_batchFunctions = {}
+
+def getBatchFunction(function):
+    """returns the registry index of a function given as its number in the explorer's function menu (like "3"),
+    a list of coefficients (like "1,0,0,0,-1") or an expression in z (like "z*z*z*z-1")"""
+    function = str(function).strip()
+    if function.isdigit():
+        fcn = int(function) - 1
+        if fcn not in getMenuFunctions():
+            raise ValueError("there is no function number {} (there are {})".format(function, len(getMenuFunctions())))
+        return fcn
+    if function not in _batchFunctions:
+        try:
+            if "z" in function:
+                _batchFunctions[function] = registerFunction(expression=function)
+            else:
+                _batchFunctions[function] = registerFunction([complex(c.replace(" ", "")) for c in function.split(",")])
+        except SyntaxError as error:
+            raise ValueError("can't read the function '{}' ({})".format(function, error.msg))
+    return _batchFunctions[function]
+
+def computeNewtonResult(coords, fcn, maxIters, epsilon=.000000001, width=400, height=400, resolution=1, workers=1, mode='distance', symmetry=False):
+    """computes the RenderResult (iteration data) of the newtons fractal of fcn over coords without drawing it"""
+    rValues, iValues = getPlaneAxes(coords, width, height, resolution)
+    result = RenderResult(len(iValues), len(rValues), coords, fcn, maxIters, epsilon, width, height, resolution, keepZ=False, mode=mode)
+    result.symmetry = symmetry
+    plan = getSymmetryPlan(fcn, rValues, iValues) if symmetry else None
+    if plan is not None:
+        render = renderSymmetric(rValues, iValues, fcn, maxIters, epsilon, workers, 64, mode, plan)
+    else:
+        render = renderTiles(rValues, iValues, fcn, maxIters, epsilon, workers, 64 if workers != 1 else None, mode)
+    for row0, col0, z, iters, rootIndex in render:
+        result.setSamples(row0, col0, z, iters, rootIndex)
+    return result
+
+def saveRawResult(path, result):
+    """writes the iteration data of a RenderResult (with the parameters it was computed with) to a .npz file"""
+    np.savez_compressed(path, rootIndex=result.rootIndex, iters=result.iters, coords=np.array(result.coords, dtype=float),
+                        function=str(getFunction(result.fcn)), method=getFunction(result.fcn).getMethodName(), maxIters=result.maxIters, epsilon=result.epsilon, mode=result.mode,
+                        resolution=result.resolution)
+
+def runJob(job):
+    """renders one job (a dictionary of the command line options) and writes it to job['out']"""
+    if job['method'] not in iterationMethods:
+        raise ValueError("unknown iteration method '{}' (use one of {})".format(job['method'], ", ".join(iterationMethods)))
+    fcn = getMethodFunction(getBatchFunction(job['function']), job['method'], job['relaxation'])
+    width, height = job['size']
+    workers = job['workers'] or os.cpu_count() or 1
+    out = job['out']
+    if job['mode'] not in terminationModes:
+        raise ValueError("unknown termination mode '{}' (use one of {})".format(job['mode'], ", ".join(terminationModes)))
+    if out.lower().endswith('.nif'):
+        saveIterationField(out, computeNewtonResult(job['coords'], fcn, job['iters'], job['eps'], width, height, job['resolution'], workers, job['mode'], job['symmetry']))
+    elif out.lower().endswith('.npz'):
+        saveRawResult(out, computeNewtonResult(job['coords'], fcn, job['iters'], job['eps'], width, height, job['resolution'], workers, job['mode'], job['symmetry']))
+    elif job['tolerance'] is not None or job['symmetry']:
+        exportPixelBuffer(out, renderNewtonFractal(job['coords'], fcn, job['iters'], job['eps'], job['scheme'], width, height,
+                                                   job['resolution'], job['gradient'], job['multCol'], workers, tolerance=job['tolerance'],
+                                                   mode=job['mode'], symmetry=job['symmetry']))
+    else:
+        exportNewtonFractal(out, job['coords'], fcn, job['iters'], job['eps'], job['scheme'], width, height,
+                            job['resolution'], job['gradient'], job['multCol'], workers, mode=job['mode'])
+
+def getParser():
+    """returns the argument parser for the batch renderer"""
+    parser = argparse.ArgumentParser(description="Render newtons fractals to .png, .ppm (images) or .nif, .npz (raw iteration data) files.")
+    parser.add_argument('--function', default="3", help="function menu number (1-{}), coefficients like 1,0,0,0,-1, or an expression in z".format(len(functions)))
+    parser.add_argument('--coords', type=float, nargs=4, default=[-5, -5, 5, 5], metavar=('RM', 'IM', 'RMAX', 'IMAX'), help="viewport in the complex plane")
+    parser.add_argument('--size', type=int, nargs=2, default=[400, 400], metavar=('WIDTH', 'HEIGHT'), help="image size in pixels")
+    parser.add_argument('--resolution', type=int, default=1, help="pixels per sample (each sample is a resolution x resolution block)")
+    parser.add_argument('--iters', type=int, default=100, help="maximum number of newton iterations")
+    parser.add_argument('--eps', type=float, default=.000000001, help="distance to a root (or step size, with --mode step) that counts as converged")
+    parser.add_argument('--mode', default='distance', help="termination mode: distance (to a known root), step (newton step size, with cycle and divergence detection) or certified (distance, stopping early near the roots)")
+    parser.add_argument('--method', default='newton', help="iteration method: {}".format(", ".join(iterationMethods)))
+    parser.add_argument('--relaxation', type=float, default=1.0, help="relaxation factor of the relaxed method (the newton step is scaled by it)")
+    parser.add_argument('--scheme', default='1', help="color scheme of the gradient ('1' to '6')")
+    parser.add_argument('--multCol', type=int, default=5, help="color multiplier")
+    parser.add_argument('--no-gradient', dest='gradient', action='store_false', help="color by root only (Mr. Iwanski's color scheme)")
+    parser.add_argument('--tolerance', type=int, default=None, help="use adaptive subdivision with this iteration tolerance (faster, not exact)")
+    parser.add_argument('--symmetry', action='store_true', help="copy the samples that are mirror images of others instead of computing them (faster, can differ right on basin boundaries)")
+    parser.add_argument('--workers', type=int, default=0, help="number of processes (0 uses every core)")
+    parser.add_argument('--out', default="NewtonsFractal.png", help="output file (.png, .ppm, or .nif / .npz for the raw iteration data)")
+    parser.add_argument('--jobs', default=None, help="json file with a list of jobs to render")
+    return parser
+
+def main(argv=None):
+    args = getParser().parse_args(argv)
+    defaults = vars(args)
+    jobs = [{}]
+    if args.jobs is not None:
+        with open(args.jobs) as jobFile:
+            jobs = json.load(jobFile)
+
+    # a job that fails is reported and the rest still run
+    failed = 0
+    try:
+        for number, job in enumerate(jobs):
+            startTime = time.time()
+            try:
+                if not isinstance(job, dict):
+                    raise ValueError("a job has to be a dictionary of options, not {!r}".format(job))
+                unknown = set(job) - set(defaults)
+                if unknown:
+                    raise ValueError("unknown option(s) " + ", ".join(sorted(unknown)))
+                job = dict(defaults, **job)
+                runJob(job)
+            except (ValueError, TypeError, KeyError, OSError) as error:
+                failed += 1
+                print("job {}: {}".format(number + 1, error), file=sys.stderr)
+                continue
+            print("{}/{}: wrote {} in {:.2f}s".format(number + 1, len(jobs), job['out'], time.time() - startTime))
+    finally:
+        shutdownProcessPool()
+    if failed:
+        sys.exit("{} of {} jobs failed".format(failed, len(jobs)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
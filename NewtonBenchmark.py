@@ -0,0 +1,211 @@
+# NewtonBenchmark.py
+# times the newtons fractal pipeline (newton iterations + coloring) so changes to it can be measured
+# instead of guessed. every combination of function, viewport, iteration cap, resolution and engine
+# is rendered headlessly and the results are written to a json file that later runs can be compared to.
+#
+#   python NewtonBenchmark.py --out bench.json
+#   python NewtonBenchmark.py --engines vectorized parallel --sizes 400 --iters 100
+#   python NewtonBenchmark.py --engines vectorized --methods newton halley householder3 relaxed --relaxation .8
+#
+# engines:
+#   scalar      one pixel at a time with newtonsNumIters and getColorGradient (the original explorer)
+#   vectorized  the batched engine and palettes, 64 x 64 sample tiles, in this process
+#   parallel    the same tiles computed in the process pool
+#   symmetric   the batched engine in 64 row bands, copying the samples that are mirror images of others (SymmetryPlan)
+#   certified   the vectorized engine, stopping early inside the certified trust regions of the roots (TrustRegions)
+#
+# reported for every run: seconds, time to first frame (first column for scalar, first tile otherwise),
+# samples and pixels per second, newton iterations per second and peak memory (traced by tracemalloc in
+# a separate run, so tracing doesn't slow the timed one down; memory used by worker processes isn't counted).
+# every engine runs once for each iteration method in --methods, and the mean iterations per sample and the
+# fraction of samples that didn't converge (from one more run of the vectorized engine) are reported with it.
+
+# imports
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from NewtonRender import *
+
+
+def findBoundaryPoint(fcn, near=complex(.3, .2), steps=60):
+    """returns a point on the boundary between two basins of fcn, close to near (found on a coarse grid then bisected)"""
+    rValues, iValues = getPlaneAxes([-2, -2, 2, 2], 64, 64)
+    z, iters, rootIndex = computeSamples(rValues, iValues, fcn, 100)
+    points = getPlaneGrid(rValues, iValues)
+
+    # the closest pair of neighbouring samples that went to different roots
+    different = rootIndex[:, 1:] != rootIndex[:, :-1]
+    rows, cols = np.nonzero(different)
+    k = np.argmin(abs(points[rows, cols] - near))
+    a, b = points[rows[k], cols[k]], points[rows[k], cols[k] + 1]
+    rootA = rootIndex[rows[k], cols[k]]
+    for n in range(steps):
+        middle = (a + b) / 2
+        if computeSamples(np.array([middle.real]), np.array([middle.imag]), fcn, 100)[2][0, 0] == rootA:
+            a = middle
+        else:
+            b = middle
+    return (a + b) / 2
+
+def getViewports(fcn):
+    """returns a dictionary of the viewports benchmarked for fcn: the default view, a deep zoom onto a basin boundary
+    and a small box around the first root (a single uniform basin)"""
+    boundary = findBoundaryPoint(fcn)
+    root = getFunction(fcn).roots[0]
+    return {
+        'default': [-5, -5, 5, 5],
+        'boundary': [boundary.real - .0001, boundary.imag - .0001, boundary.real + .0001, boundary.imag + .0001],
+        'basin': [root.real - .05, root.imag - .05, root.real + .05, root.imag + .05],
+    }
+
+def runScalar(coords, fcn, maxIters, epsilon, width, height, resolution, workers):
+    """renders with the per-pixel functions (newtonsNumIters and getColorGradient), returns (firstFrameSeconds, newtonIterations)"""
+    startTime = time.perf_counter()
+    firstFrame = None
+    totalIters = 0
+    rValues, iValues = getPlaneAxes(coords, width, height, resolution)
+    for r in rValues:
+        for i in iValues:
+            try:
+                z, numIters = newtonsNumIters(complex(r, i), fcn, maxIters, epsilon)
+                getColorGradient(z, fcn, numIters, maxIters)
+            except ZeroDivisionError:
+                numIters = 0
+            totalIters += numIters
+        if firstFrame is None:
+            firstFrame = time.perf_counter() - startTime
+    return firstFrame, totalIters
+
+def runTiles(coords, fcn, maxIters, epsilon, width, height, resolution, workers, mode='distance'):
+    """renders with the batched engine in tiles (in the process pool when workers != 1) and colors every tile,
+    returns (firstFrameSeconds, newtonIterations)"""
+    startTime = time.perf_counter()
+    firstFrame = None
+    totalIters = 0
+    rValues, iValues = getPlaneAxes(coords, width, height, resolution)
+    palette = getPalette(len(getFunction(fcn).roots), maxIters)
+    for row0, col0, z, iters, rootIndex in renderTiles(rValues, iValues, fcn, maxIters, epsilon, workers, 64, mode):
+        palette.getColors(rootIndex, iters)
+        totalIters += int(iters.sum())
+        if firstFrame is None:
+            firstFrame = time.perf_counter() - startTime
+    return firstFrame, totalIters
+
+def runSymmetric(coords, fcn, maxIters, epsilon, width, height, resolution, workers):
+    """renders with the batched engine in bands, only computing the samples the SymmetryPlan says to, and colors every band.
+    returns (firstFrameSeconds, newtonIterations), where only the iterations of computed samples are counted"""
+    startTime = time.perf_counter()
+    firstFrame = None
+    rValues, iValues = getPlaneAxes(coords, width, height, resolution)
+    palette = getPalette(len(getFunction(fcn).roots), maxIters)
+    plan = getSymmetryPlan(fcn, rValues, iValues, minSaving=0)
+    computed = plan.computed if plan is not None else np.ones((len(iValues), len(rValues)), dtype=bool)
+    totalIters = 0
+    for row0, col0, z, iters, rootIndex in renderSymmetric(rValues, iValues, fcn, maxIters, epsilon, workers, 64, plan=plan):
+        palette.getColors(rootIndex, iters)
+        totalIters += int(iters[computed[row0:row0 + iters.shape[0]]].sum())
+        if firstFrame is None:
+            firstFrame = time.perf_counter() - startTime
+    return firstFrame, totalIters
+
+def runCertified(coords, fcn, maxIters, epsilon, width, height, resolution, workers):
+    """runTiles in the 'certified' termination mode, returns (firstFrameSeconds, newtonIterations). the iterations are
+    the same as the vectorized engine's, the ones worked out inside the trust regions are counted too"""
+    return runTiles(coords, fcn, maxIters, epsilon, width, height, resolution, workers, 'certified')
+
+engines = {
+    'scalar': (runScalar, 1),
+    'vectorized': (runTiles, 1),
+    'parallel': (runTiles, None),
+    'symmetric': (runSymmetric, 1),
+    'certified': (runCertified, 1),
+}
+
+def runBenchmark(engine, coords, fcn, maxIters, epsilon, width, height, resolution, repeat=1, traceMemory=True):
+    """times one engine on one viewport (best of repeat runs) and returns a dictionary of the measurements"""
+    run, workers = engines[engine]
+    workers = workers or os.cpu_count() or 1
+    rValues, iValues = getPlaneAxes(coords, width, height, resolution)
+    numSamples = len(rValues) * len(iValues)
+
+    best = None
+    for n in range(repeat):
+        startTime = time.perf_counter()
+        firstFrame, totalIters = run(coords, fcn, maxIters, epsilon, width, height, resolution, workers)
+        seconds = time.perf_counter() - startTime
+        if best is None or seconds < best[0]:
+            best = (seconds, firstFrame, totalIters)
+    seconds, firstFrame, totalIters = best
+
+    peakBytes = None
+    if traceMemory:
+        tracemalloc.start()
+        run(coords, fcn, maxIters, epsilon, width, height, resolution, workers)
+        peakBytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {'engine': engine, 'workers': workers, 'function': str(getFunction(fcn)), 'coords': list(coords),
+            'maxIters': maxIters, 'epsilon': epsilon, 'width': width, 'height': height, 'resolution': resolution,
+            'samples': numSamples, 'seconds': seconds, 'firstFrameSeconds': firstFrame,
+            'samplesPerSecond': numSamples / seconds, 'pixelsPerSecond': width * height / seconds,
+            'newtonIterations': totalIters, 'iterationsPerSecond': totalIters / seconds, 'peakBytes': peakBytes}
+
+def getMethodStats(coords, fcn, maxIters, epsilon, width, height, resolution):
+    """returns (meanIters, notConverged) of the frame (see getConvergenceStats), computed with the vectorized engine"""
+    rValues, iValues = getPlaneAxes(coords, width, height, resolution)
+    z, iters, rootIndex = computeSamples(rValues, iValues, fcn, maxIters, epsilon)
+    return getConvergenceStats(iters, maxIters)
+
+def getMachine():
+    """returns a dictionary describing the machine and versions the benchmark ran on"""
+    return {'platform': platform.platform(), 'processor': platform.processor(), 'cpuCount': os.cpu_count(),
+            'python': platform.python_version(), 'numpy': np.__version__}
+
+def getParser():
+    """returns the argument parser for the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the newtons fractal render pipeline and write the results to json.")
+    parser.add_argument('--functions', type=int, nargs='+', default=list(range(1, len(functions) + 1)), help="function menu numbers")
+    parser.add_argument('--viewports', nargs='+', default=['default', 'boundary', 'basin'], help="default, boundary and/or basin")
+    parser.add_argument('--iters', type=int, nargs='+', default=[50, 200], help="iteration caps")
+    parser.add_argument('--resolutions', type=int, nargs='+', default=[1, 2], help="pixels per sample")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200], help="image sizes (square, in pixels)")
+    parser.add_argument('--engines', nargs='+', default=list(engines), choices=list(engines), help="engines to run")
+    parser.add_argument('--methods', nargs='+', default=['newton'], choices=list(iterationMethods), help="iteration methods")
+    parser.add_argument('--relaxation', type=float, default=1.0, help="relaxation factor of the relaxed method")
+    parser.add_argument('--eps', type=float, default=.000000001, help="epsilon")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per benchmark (the fastest is kept)")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the traced run for peak memory")
+    parser.add_argument('--out', default="NewtonBenchmark.json", help="json file for the results")
+    return parser
+
+def main(argv=None):
+    args = getParser().parse_args(argv)
+    results = []
+    for number in args.functions:
+        viewports = getViewports(number - 1)
+        for name in args.viewports:
+            for maxIters in args.iters:
+                for resolution in args.resolutions:
+                    for size in args.sizes:
+                        for method in args.methods:
+                            fcn = getMethodFunction(number - 1, method, args.relaxation)
+                            meanIters, notConverged = getMethodStats(viewports[name], fcn, maxIters, args.eps, size, size, resolution)
+                            for engine in args.engines:
+                                result = runBenchmark(engine, viewports[name], fcn, maxIters, args.eps, size, size, resolution, args.repeat, args.memory)
+                                result.update(viewport=name, method=getFunction(fcn).getMethodName(), meanIters=meanIters, notConverged=notConverged)
+                                results.append(result)
+                                print("{:10} {:12} {:12} {:8} iters={:<4} res={} size={:<4} {:8.3f}s  first {:7.3f}s  {:10.0f} px/s  {:12.0f} iters/s  {:6.2f} iters/sample  {:6.2%} not converged".format(
+                                    engine, str(getFunction(fcn)), result['method'], name, maxIters, resolution, size, result['seconds'],
+                                    result['firstFrameSeconds'], result['pixelsPerSecond'], result['iterationsPerSecond'], meanIters, notConverged))
+
+    shutdownProcessPool()
+    with open(args.out, 'w') as outFile:
+        json.dump({'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'machine': getMachine(), 'results': results}, outFile, indent=1)
+    print("wrote " + args.out)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
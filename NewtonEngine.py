@@ -0,0 +1,669 @@
+# NewtonEngine.py
+# batched version of the newtons method iteration used by the Newtons Method Explorer.
+# instead of iterating one pixel at a time, the whole grid of starting points is stored
+# in numpy arrays and every point that has not converged yet is iterated together.
+
+# imports
+import cmath
+import math
+import threading
+import time
+import numpy as np
+from NewtonFunctions import *
+from NewtonProfile import getProfile
+
+
+def f(z, whichFunction=0):
+    """f(z)"""
+    return getFunction(whichFunction).f(z)
+
+def fprime(z, whichFunction=0):
+    """f'(z)"""
+    return getFunction(whichFunction).fprime(z)
+
+def newtons(z, fcn, numIters):
+    """iterates newtons root-finding algorithm for specified function"""
+    fn = getFunction(fcn)
+    for n in range(numIters):
+        z = fn.step(z)
+    return z
+
+def newtonsNumIters(z, fcn, maxIters, epsilon=.01):
+    """iterates newtons root-finding algorithm for specified function while the distance between the closest root and z is greater then epsilon"""
+    fn = getFunction(fcn)
+    rootIndex = getRootIndex(fn.roots, epsilon)
+    numIters = 0
+    while maxIters > numIters and rootIndex.query(z) < 0:
+        # iterate z if condition fails
+        z = fn.step(z)
+        numIters += 1
+    return (z, numIters)
+
+def getDistanceOfCloseRoot(z, rootList):
+    """returns the distance of the closet root to z"""
+    closeRoot = 0
+    minD = abs(z - rootList[closeRoot])
+    for rootNum in range(1, len(rootList)):
+        d = abs(z - rootList[rootNum])
+        if d < minD:
+            minD = d
+            closeRoot = rootNum
+    return minD
+
+def getCloseRootIndex(z, rootList):
+    """returns the index of the closet root to z"""
+    closeRoot = 0
+    minD = abs(z - rootList[closeRoot])
+    for rootNum in range(0, len(rootList)):
+        d = abs(z - rootList[rootNum])
+        if d < minD:
+            minD = d
+            closeRoot = rootNum
+    return closeRoot
+
+
+class ComplexGrid:
+
+    """An array of complex numbers stored as separate real and imaginary float arrays.
+    The arithmetic is written out one real operation at a time, in the same order python
+    uses for its complex numbers, so f and fprime give exactly the same answer for a
+    ComplexGrid as they do for every point on its own. (numpy's complex arrays can use
+    fused multiply-adds, which round differently.)"""
+
+    def __init__(self, re, im):
+        self.re = re
+        self.im = im
+
+    def __repr__(self):
+        return "ComplexGrid({}, {})".format(self.re, self.im)
+
+    @staticmethod
+    def _parts(other):
+        # python turns an int or float into complex(x, 0) before doing complex math with it
+        if isinstance(other, ComplexGrid):
+            return other.re, other.im
+        other = complex(other)
+        return other.real, other.imag
+
+    def __add__(self, other):
+        ore, oim = self._parts(other)
+        return ComplexGrid(self.re + ore, self.im + oim)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        ore, oim = self._parts(other)
+        return ComplexGrid(self.re - ore, self.im - oim)
+
+    def __rsub__(self, other):
+        ore, oim = self._parts(other)
+        return ComplexGrid(ore - self.re, oim - self.im)
+
+    def __mul__(self, other):
+        ore, oim = self._parts(other)
+        return ComplexGrid(self.re * ore - self.im * oim, self.re * oim + self.im * ore)
+
+    def __rmul__(self, other):
+        ore, oim = self._parts(other)
+        return ComplexGrid(ore * self.re - oim * self.im, ore * self.im + oim * self.re)
+
+    def __truediv__(self, other):
+        ore, oim = self._parts(other)
+        return complexDivide(self.re, self.im, ore, oim)
+
+    def __neg__(self):
+        return ComplexGrid(-self.re, -self.im)
+
+    def __abs__(self):
+        return np.hypot(self.re, self.im)
+
+    def toArray(self):
+        """returns the points as a numpy complex array"""
+        z = np.empty(np.shape(self.re), dtype=complex)
+        z.real = self.re
+        z.imag = self.im
+        return z
+
+def complexDivide(ar, ai, br, bi):
+    """divides (ar + ai*j) / (br + bi*j) for arrays using the same steps python uses to divide two complex numbers"""
+    ar, ai, br, bi = np.broadcast_arrays(ar, ai, br, bi)
+
+    # divide top and bottom by whichever part of b is bigger (the same choice python makes)
+    byReal = np.abs(br) >= np.abs(bi)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(byReal, bi / br, br / bi)
+        denom = np.where(byReal, br + bi * ratio, br * ratio + bi)
+        re = np.where(byReal, ar + ai * ratio, ar * ratio + ai) / denom
+        im = np.where(byReal, ai - ar * ratio, ai * ratio - ar) / denom
+
+    # python raises an error when dividing by zero, here the point just becomes nan and stops iterating
+    zero = (br == 0) & (bi == 0)
+    if zero.any():
+        re[zero] = np.nan
+        im[zero] = np.nan
+    return ComplexGrid(re, im)
+
+class RootIndex:
+
+    """A lookup table that answers "which root is z within epsilon of?" without scanning every root.
+    The plane is split into square cells a quarter of the smallest distance between two roots wide,
+    and every cell that a root's epsilon-square touches remembers that root, so a point only has to
+    be compared with the one root of its cell. When epsilon is too big for that (or the cells of two
+    roots would overlap) it falls back to comparing with every root."""
+
+    def __init__(self, rootList, epsilon):
+        self.rootList = [complex(root) for root in rootList]
+        self.epsilon = epsilon
+        self.rootRe = np.array([root.real for root in self.rootList])
+        self.rootIm = np.array([root.imag for root in self.rootList])
+
+        minSep = min([abs(a - b) for k, a in enumerate(self.rootList) for b in self.rootList[k + 1:]] or [float('inf')])
+        self.cellSize = minSep / 4 if minSep < float('inf') else max(1.0, 8 * epsilon)
+        self.cells = {}
+        if not 0 <= 8 * epsilon < minSep:
+            self.cells = None
+            return
+
+        # the table only covers the area around the roots, every point outside it is far from all of them
+        self.x0 = self.rootRe.min() - 2 * self.cellSize
+        self.y0 = self.rootIm.min() - 2 * self.cellSize
+        for k, root in enumerate(self.rootList):
+            # the squares are made a little bigger than epsilon so rounding can't push a point out of them
+            c0, r0 = self._cell(root.real - 2 * epsilon, root.imag - 2 * epsilon)
+            c1, r1 = self._cell(root.real + 2 * epsilon, root.imag + 2 * epsilon)
+            for col in range(c0, c1 + 1):
+                for row in range(r0, r1 + 1):
+                    if self.cells.setdefault((col, row), k) != k:
+                        self.cells = None
+                        return
+        self.numCols = max(col for col, row in self.cells) + 2
+        self.numRows = max(row for col, row in self.cells) + 2
+        keys = np.array([col * self.numRows + row for col, row in self.cells], dtype=np.int64)
+        order = np.argsort(keys)
+        self.keys = keys[order]
+        self.keyRoots = np.array(list(self.cells.values()), dtype=np.int64)[order]
+
+    def _cell(self, re, im):
+        return math.floor((re - self.x0) / self.cellSize), math.floor((im - self.y0) / self.cellSize)
+
+    def query(self, z):
+        """returns the index of the root z is within epsilon of, or -1 if there isn't one.
+        (like newtonsNumIters, a point that has become nan counts as finished, with root 0)"""
+        if self.cells is None or not cmath.isfinite(z):
+            minD = getDistanceOfCloseRoot(z, self.rootList)
+            if self.epsilon < minD:
+                return -1
+            return getCloseRootIndex(z, self.rootList)
+        k = self.cells.get(self._cell(z.real, z.imag), -1)
+        if k < 0 or self.epsilon < abs(z - self.rootList[k]):
+            return -1
+        return k
+
+    def queryGrid(self, z):
+        """batched query for a ComplexGrid: returns arrays of the root index of every point and whether it is
+        finished (within epsilon of that root, or nan)"""
+        rootIndex, hit, d = self.measureGrid(z)
+        if self.cells is None:
+            return rootIndex, ~(self.epsilon < d)
+        lost = np.isnan(np.hypot(z.re, z.im))
+        return rootIndex, (hit & ~(self.epsilon < d)) | lost
+
+    def measureGrid(self, z):
+        """returns arrays of the root index of every point of a ComplexGrid, whether the point is in one of that root's
+        cells (every point is when there are no cells) and its distance to that root"""
+        if self.cells is None:
+            rootIndex, minD = getCloseRootIndexGrid(z, self.rootList)
+            return rootIndex, np.ones(minD.shape, dtype=bool), minD
+
+        with np.errstate(invalid='ignore', over='ignore'):
+            col = np.floor((z.re - self.x0) / self.cellSize)
+            row = np.floor((z.im - self.y0) / self.cellSize)
+            inside = (col >= 0) & (col < self.numCols) & (row >= 0) & (row < self.numRows)
+            key = np.where(inside, col * self.numRows + row, -1).astype(np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, key), self.keys.size - 1)
+        hit = self.keys[pos] == key
+        rootIndex = np.where(hit, self.keyRoots[pos], 0)
+
+        # same distance as abs(z - root), so the answer matches comparing with every root
+        d = np.hypot(z.re - self.rootRe[rootIndex], z.im - self.rootIm[rootIndex])
+        return rootIndex.astype(np.uint8), hit, d
+
+# the root indexes made so far, so each one is only built once (the lock is there because renders on a background
+# thread (RenderJob) and the main thread both use the cache)
+_rootIndexes = {}
+_rootIndexesLock = threading.Lock()
+maxRootIndexes = 16
+
+def getRootIndex(rootList, epsilon):
+    """returns the RootIndex for these roots and epsilon, building it only if it isn't cached already"""
+    key = (tuple(complex(root) for root in rootList), epsilon)
+    with _rootIndexesLock:
+        if key not in _rootIndexes:
+            if len(_rootIndexes) >= maxRootIndexes:
+                del _rootIndexes[next(iter(_rootIndexes))]
+            _rootIndexes[key] = RootIndex(rootList, epsilon)
+        return _rootIndexes[key]
+
+# the unit roundoff of a python float
+unitRoundoff = 2.0 ** -53
+
+# how many steps ahead TrustRegions.predictGrid looks before it gives up on a point
+maxPredictedSteps = 64
+
+class TrustRegions:
+
+    """Disks around the roots of a polynomial inside which newtons method is certain to converge to that root,
+    used to work out the rest of an orbit instead of iterating it.
+
+    With h = z - r for a root r and c_j the taylor coefficients of the polynomial at r, a newton step gives
+    N(z) - r = h^m A(h) / D(h) where D(h) = sum j c_j h^(j-1) is f'(z), A(h) = sum (j-1) c_j h^(j-m) and m is the
+    order of convergence (2 unless the root's taylor series skips the h^2 term). Bounding |A| and |D| over a disk
+    gives kLow e^m <= e' <= kHigh e^m for the distance e to the root, and the radius of the disk is picked so that
+    kHigh radius^(m-1) <= 1/2 (a Kantorovich style bound: an orbit that gets inside stays inside and converges).
+    rho bounds how far the stored root is from the exact one and delta the rounding error of one step (using the
+    usual floating point error model, with a safety factor), so running the bounds forward shows which iteration
+    is the first one within epsilon of the stored root, whenever that isn't too close to call."""
+
+    def __init__(self, fcn, rootList):
+        fn = getFunction(fcn)
+        self.rootList = [complex(root) for root in rootList]
+        self.rootRe = np.array([root.real for root in self.rootList])
+        self.rootIm = np.array([root.imag for root in self.rootList])
+        numRoots = len(self.rootList)
+        self.radius = np.zeros(numRoots)
+        self.order = np.full(numRoots, 2.0)
+        self.kHigh = np.zeros(numRoots)
+        self.kLow = np.zeros(numRoots)
+        self.rho = np.zeros(numRoots)
+        self.delta = np.zeros(numRoots)
+
+        # the disks are kept well apart so every point in one is closest to its root (and RootIndex can use cells)
+        minSep = min([abs(a - b) for k, a in enumerate(self.rootList) for b in self.rootList[k + 1:]] or [float('inf')])
+        absCoefficients = [abs(complex(c)) for c in fn.coefficients]
+        for k, root in enumerate(self.rootList):
+            taylor = getTaylorCoefficients(fn.coefficients, root)
+            largest = minSep / 9 if minSep < float('inf') else 1 + abs(root)
+            # the biggest radius (halving from the largest) the bounds hold for, a root that isn't simple gets none
+            for halvings in range(60):
+                bounds = self._getBounds(taylor, absCoefficients, root, largest / 2 ** halvings)
+                if bounds is not None:
+                    self.radius[k], self.order[k], self.kHigh[k], self.kLow[k], self.rho[k], self.delta[k] = bounds
+                    break
+        self.index = RootIndex(self.rootList, self.radius.max() if numRoots else 0)
+        # the step tables for every epsilon used so far (see _getStepTable)
+        self.stepTables = {}
+
+    def _getBounds(self, taylor, absCoefficients, root, radius):
+        # returns (radius, order, kHigh, kLow, rho, delta) for the disk, or None if the bounds don't hold on it
+        c = [abs(t) for t in taylor]
+        degree = len(c) - 1
+        reach = abs(root) + 2 * radius
+        # the rounding error of working out f anywhere in the disk
+        fError = 32 * (degree + 1) * unitRoundoff * sum(a * reach ** (degree - i) for i, a in enumerate(absCoefficients))
+        spread = sum(j * c[j] * (2 * radius) ** (j - 1) for j in range(2, degree + 1))
+        if not c[1] - spread > 0:
+            return None
+        rho = 2 * (c[0] + fError) / (c[1] - spread)
+        if rho > radius / 4:
+            return None
+
+        # the bounds hold around the exact root, which is within rho of the stored one
+        outer = radius + rho
+        spread = sum(j * c[j] * outer ** (j - 1) for j in range(2, degree + 1))
+        dLow, dHigh = c[1] - spread, c[1] + spread
+        order = next((j for j in range(2, degree + 1) if taylor[j] != 0), 2)
+        aHigh = sum((j - 1) * c[j] * outer ** (j - order) for j in range(order, degree + 1))
+        aLow = 2 * (order - 1) * c[order] - aHigh if order <= degree else 0
+        kHigh = aHigh / dLow * (1 + 1e-6)
+        kLow = max(aLow, 0) / dHigh * (1 - 1e-6)
+        # one step rounds f / f' and the subtraction from z, and the taylor terms below the order are only
+        # zero at the stored root (they are about rho times the next ones at the exact root)
+        skipped = rho * sum(j * j * c[j] * outer ** (j - 2) for j in range(2, degree + 1)) * outer ** 2 / dLow
+        delta = 16 * (fError / dLow + 4 * (degree + 1) * unitRoundoff * outer + unitRoundoff * reach) + skipped
+        if kHigh * outer ** (order - 1) > .5 or delta > radius / 4:
+            return None
+        return radius, order, kHigh, kLow, rho, delta
+
+    def _runBounds(self, d, count):
+        # returns the upper and lower bounds on the distance to the stored root after count steps from the distance d to it
+        rho, order, kHigh, kLow, delta = (a[:, None] for a in (self.rho, self.order, self.kHigh, self.kLow, self.delta))
+        upper = d + rho
+        lower = np.maximum(d - rho, 0)
+        for step in range(count):
+            upper = kHigh * upper ** order + delta
+            lower = np.maximum(kLow * lower ** order - delta, 0)
+        return upper + rho, lower - rho
+
+    def _getStepTable(self, epsilon):
+        # a point is certain to take c more steps to get within epsilon of root k if its distance d to it is in
+        # (lowEnd[k, c - 1], highEnd[k, c - 1]]: it is within after c steps (the bounds only grow with d) and for every
+        # earlier step it is certainly outside. returns (lowEnd, highEnd), arrays with one row per root
+        if epsilon in self.stepTables:
+            return self.stepTables[epsilon]
+        # the margins cover the rounding of the distance the convergence test works out
+        inside, outside = epsilon * (1 - 1e-12), epsilon * (1 + 1e-12)
+        radius = self.radius[:, None]
+
+        # the number of steps that gets every point of the disks within epsilon (or as close as the bounds get)
+        numSteps = 1
+        upper = self._runBounds(radius, 1)[0]
+        while numSteps < maxPredictedSteps and not (upper <= inside).all():
+            nextUpper = self._runBounds(radius, numSteps + 1)[0]
+            if not (nextUpper < upper).any():
+                break
+            upper = nextUpper
+            numSteps += 1
+
+        # bisect (for every root and number of steps at once) for the farthest distance that is certainly within
+        # epsilon after that many steps and the closest one that is certainly still outside it
+        counts = np.arange(1, numSteps + 1)
+        withinAt = lambda d: np.stack([self._runBounds(d[:, [c - 1]], c)[0][:, 0] for c in counts], axis=1) <= inside
+        outsideAt = lambda d: np.stack([self._runBounds(d[:, [c - 1]], c)[1][:, 0] for c in counts], axis=1) > outside
+        shape = (len(self.rootList), numSteps)
+        far = np.broadcast_to(radius, shape).copy()
+        zero = np.zeros(shape)
+        withinLow, withinHigh = zero.copy(), far.copy()
+        outsideLow, outsideHigh = zero.copy(), far.copy()
+        for halving in range(60):
+            middle = (withinLow + withinHigh) / 2
+            ok = withinAt(middle)
+            withinLow, withinHigh = np.where(ok, middle, withinLow), np.where(ok, withinHigh, middle)
+            middle = (outsideLow + outsideHigh) / 2
+            ok = outsideAt(middle)
+            outsideLow, outsideHigh = np.where(ok, outsideLow, middle), np.where(ok, middle, outsideHigh)
+        within = np.where(withinAt(far), far, np.where(withinAt(zero), withinLow, -np.inf))
+        outside = np.where(outsideAt(far), outsideHigh, np.inf)
+        within[self.radius == 0] = -np.inf
+
+        # c steps also needs every earlier step to be certainly outside and not already within
+        lowEnd = np.full(shape, -np.inf)
+        lowEnd[:, 1:] = np.maximum(np.maximum.accumulate(within, axis=1), np.maximum.accumulate(outside, axis=1))[:, :-1]
+        self.stepTables[epsilon] = lowEnd, within
+        return self.stepTables[epsilon]
+
+    def queryGrid(self, z, epsilon):
+        """like RootIndex.queryGrid for epsilon, returns arrays of the root index of every point of the ComplexGrid z and
+        whether it is finished, and also the positions of the unfinished points that are certain to get within epsilon
+        of that root and how many more newton steps each one takes, worked out from the bounds instead of iterated.
+        (a point outside every disk, or too close to epsilon to call, isn't certain)"""
+        if epsilon > self.index.epsilon:
+            # every point inside a disk is within epsilon already
+            rootIndex, done = getRootIndex(self.rootList, epsilon).queryGrid(z)
+            return rootIndex, done, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        rootIndex, hit, d = self.index.measureGrid(z)
+        done = (hit & ~(epsilon < d)) | np.isnan(np.hypot(z.re, z.im))
+        # a point within a disk is always in its root's cells, and the step ranges end inside the disk of their
+        # root, so the biggest disk is enough to pick the points to look up
+        pick = np.flatnonzero((epsilon < d) & (d <= self.index.epsilon))
+        if pick.size == 0:
+            return rootIndex, done, pick, pick
+
+        lowEnd, highEnd = self._getStepTable(epsilon)
+        k = rootIndex[pick]
+        d = d[pick]
+        # the step ranges of a root are in order, so only the last one that starts below d can hold it
+        steps = (d[:, None] > lowEnd[k]).sum(axis=1)
+        certain = d <= highEnd[k, steps - 1]
+        return rootIndex, done, pick[certain], steps[certain]
+
+# the trust regions made so far, so each one is only built once (locked like _rootIndexes)
+_trustRegions = {}
+_trustRegionsLock = threading.Lock()
+
+def getTrustRegions(fcn, rootList):
+    """returns the TrustRegions for the function and roots, building them only if they aren't cached already"""
+    key = (tuple(complex(c) for c in getFunction(fcn).coefficients), tuple(complex(root) for root in rootList))
+    with _trustRegionsLock:
+        if key not in _trustRegions:
+            if len(_trustRegions) >= maxRootIndexes:
+                del _trustRegions[next(iter(_trustRegions))]
+            _trustRegions[key] = TrustRegions(fcn, rootList)
+        return _trustRegions[key]
+
+def getPlaneAxes(coords, width, height, resolution=1, sweep=0, numSweeps=1):
+    """returns arrays of the real and imaginary values that generateNewtonFractal visits during one sweep.
+    the values are accumulated exactly like the per-pixel while loops so both give the same starting points"""
+    rm, im, rM, iM = coords
+    rstep = resolution * (rM - rm) / width
+    istep = resolution * (iM - im) / height
+
+    rValues = []
+    r = rm + sweep * rstep
+    while r < rM:
+        rValues.append(r)
+        r += rstep * numSweeps
+
+    iValues = []
+    i = im
+    while i < iM:
+        iValues.append(i)
+        i += istep
+
+    return np.array(rValues, dtype=float), np.array(iValues, dtype=float)
+
+def getPlaneGrid(rValues, iValues):
+    """returns a 2d array of starting points, row i holds the points with imaginary part iValues[i]"""
+    z = np.empty((len(iValues), len(rValues)), dtype=complex)
+    z.real = rValues[np.newaxis, :]
+    z.imag = iValues[:, np.newaxis]
+    return z
+
+def getCloseRootIndexGrid(z, rootList):
+    """returns arrays of the index of and distance to the closest root for every point in z (a ComplexGrid)"""
+    rootIndex = np.zeros(np.shape(z.re), dtype=np.uint8)
+    minD = abs(z - rootList[0])
+    for rootNum in range(1, len(rootList)):
+        d = abs(z - rootList[rootNum])
+        # strictly closer, so ties go to the lower root index like getCloseRootIndex
+        closer = d < minD
+        rootIndex[closer] = rootNum
+        minD = np.where(closer, d, minD)
+    return rootIndex, minD
+
+def newtonsGrid(z, fcn, numIters):
+    """iterates newtons root-finding algorithm numIters times for every point in the complex array z"""
+    z = np.asarray(z, dtype=complex)
+    fn = getFunction(fcn)
+    w = ComplexGrid(z.real.copy(), z.imag.copy())
+    for n in range(numIters):
+        with np.errstate(over='ignore', invalid='ignore'):
+            w = fn.step(w)
+    return w.toArray()
+
+def newtonsNumItersGrid(z, fcn, rootList, maxIters, epsilon=.01, startIters=0, certify=False):
+    """batched newtonsNumIters: iterates every point of the complex array z while it is farther than epsilon from its closest root.
+    startIters (a number or an array shaped like z) is how many iterations the points of z have already had, so a
+    render can be carried on from where it stopped (with a higher maxIters or a smaller epsilon) instead of starting over.
+    with certify, a point stops as soon as it is inside the TrustRegions disk of a root and its last few iterations can be
+    worked out from the bounds. the number of iterations and the root are the same, but its z is where it stopped.
+    returns arrays of the final z, the number of iterations and the index of the closest root"""
+    fn = getFunction(fcn)
+    z = np.asarray(z, dtype=complex)
+    shape = z.shape
+    zRe = z.real.reshape(-1).copy()
+    zIm = z.imag.reshape(-1).copy()
+    numIters = np.zeros(zRe.size, dtype=np.int64)
+    numIters += np.reshape(startIters, -1) if np.ndim(startIters) else startIters
+    index = getRootIndex(rootList, epsilon)
+    rootIndex, done = index.queryGrid(ComplexGrid(zRe, zIm))
+
+    # the points that have already had maxIters iterations aren't iterated, they still get their closest root
+    spent = ~done & (numIters >= maxIters)
+    if spent.any():
+        rootIndex[spent] = getCloseRootIndexGrid(ComplexGrid(zRe[spent], zIm[spent]), rootList)[0]
+
+    # only the points that are still farther than epsilon from a root are kept in the active arrays
+    active = np.flatnonzero(~done & ~spent)
+    itersLeft = maxIters - numIters[active]
+    w = ComplexGrid(zRe[active], zIm[active])
+    # (the bounds of the trust regions are for newtons method, the other iteration methods are just iterated)
+    trust = getTrustRegions(fcn, rootList) if certify and fn.method == 'newton' else None
+    n = 0
+    profile = getProfile()
+    while active.size > 0:
+        if profile is not None:
+            startTime = time.perf_counter()
+        # points that blow up (high degree polynomials far from the roots) become inf or nan and stop
+        with np.errstate(over='ignore', invalid='ignore'):
+            w = fn.step(w)
+        n += 1
+        if profile is not None:
+            searchTime = time.perf_counter()
+            profile.add('newton steps', startTime, searchTime)
+
+        # the convergence test gives the root index too, so it isn't worked out twice
+        if trust is not None:
+            closeRoot, done, certified, steps = trust.queryGrid(w, epsilon)
+            done[certified] = True
+        else:
+            closeRoot, done = index.queryGrid(w)
+        if profile is not None:
+            profile.add('root search', searchTime)
+        atMaxIters = itersLeft == n
+        if atMaxIters.any():
+            # the points that never got close to a root still get their closest root
+            left = atMaxIters & ~done
+            if left.any():
+                closeRoot[left] = getCloseRootIndexGrid(ComplexGrid(w.re[left], w.im[left]), rootList)[0]
+            done |= atMaxIters
+
+        # store the points that just stopped and mask them out of the next pass
+        if done.any():
+            stopped = active[done]
+            zRe[stopped] = w.re[done]
+            zIm[stopped] = w.im[done]
+            numIters[stopped] += n
+            if trust is not None and certified.size > 0:
+                # the predicted steps are added on, but a point still stops at maxIters (it has the same closest root)
+                certified = active[certified]
+                numIters[certified] = np.minimum(numIters[certified] + steps, maxIters)
+            rootIndex[stopped] = closeRoot[done]
+            keep = ~done
+            active = active[keep]
+            itersLeft = itersLeft[keep]
+            w = ComplexGrid(w.re[keep], w.im[keep])
+
+    zFinal = ComplexGrid(zRe, zIm).toArray()
+    return zFinal.reshape(shape), numIters.reshape(shape), rootIndex.reshape(shape)
+
+# what happened to a point in the step size termination mode (newtonsStep and newtonsStepGrid)
+STATUS_CONVERGED = 0    # the newton step got smaller than epsilon (or |f(z)| got to fTolerance)
+STATUS_MAXITERS = 1     # still moving after maxIters iterations
+STATUS_CYCLE = 2        # came back to within epsilon of an earlier point without converging (a periodic orbit)
+STATUS_DIVERGED = 3     # the step blew up (f'(z) is zero, or tiny compared to f(z)) or z stopped being a number
+
+# a newton step bigger than this means f'(z) was (close to) zero, so the point is treated as diverged
+divergenceStep = 1e10
+
+def newtonsStep(z, fcn, maxIters, epsilon=.000000001, fTolerance=0):
+    """iterates newtons method on one point until the step |z_(n+1) - z_n| is smaller than epsilon, without using the roots.
+    also stops for cycles and divergence (see newtonsStepGrid). returns (z, numIters, status)"""
+    fn = getFunction(fcn)
+    saved = z
+    nextSave = 2
+    for n in range(1, maxIters + 1):
+        try:
+            new = fn.step(z)
+        except (ZeroDivisionError, OverflowError):
+            return z, n, STATUS_DIVERGED
+        step = abs(new - z)
+        z = new
+        if step < epsilon or (fTolerance and abs(fn.f(z)) <= fTolerance):
+            return z, n, STATUS_CONVERGED
+        if not cmath.isfinite(z) or step > divergenceStep:
+            return z, n, STATUS_DIVERGED
+        if abs(z - saved) < epsilon:
+            return z, n, STATUS_CYCLE
+        if n == nextSave:
+            saved = z
+            nextSave *= 2
+    return z, maxIters, STATUS_MAXITERS
+
+def newtonsStepGrid(z, fcn, rootList, maxIters, epsilon=.000000001, fTolerance=0):
+    """batched newtons method that stops each point on its own progress instead of its distance to known roots:
+    converged once the step |z_(n+1) - z_n| is smaller than epsilon (or |f(z)| <= fTolerance, if that is set),
+    diverged if the step blows up or isn't a number, and cycling if it comes back to within epsilon of the point saved at
+    the last power of two iterations (Brent's method). the roots are only used afterwards, each point gets the index of
+    the root closest to where it ended. returns arrays of the final z, the number of iterations, the root index and the status"""
+    fn = getFunction(fcn)
+    z = np.asarray(z, dtype=complex)
+    shape = z.shape
+    zRe = z.real.reshape(-1).copy()
+    zIm = z.imag.reshape(-1).copy()
+    numIters = np.zeros(zRe.size, dtype=np.int64)
+    status = np.full(zRe.size, STATUS_MAXITERS, dtype=np.uint8)
+
+    active = np.arange(zRe.size)
+    w = ComplexGrid(zRe.copy(), zIm.copy())
+    saved = ComplexGrid(zRe.copy(), zIm.copy())
+    nextSave = 2
+    n = 0
+    profile = getProfile()
+    while n < maxIters and active.size > 0:
+        if profile is not None:
+            startTime = time.perf_counter()
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            new = fn.step(w)
+            if profile is not None:
+                testTime = time.perf_counter()
+                profile.add('newton steps', startTime, testTime)
+            step = abs(new - w)
+            converged = step < epsilon
+            if fTolerance:
+                converged |= abs(fn.f(new)) <= fTolerance
+            diverged = ~converged & ~(step <= divergenceStep)
+            cycled = ~converged & ~diverged & (abs(new - saved) < epsilon)
+        n += 1
+        w = new
+        if n == nextSave:
+            saved = ComplexGrid(w.re.copy(), w.im.copy())
+            nextSave *= 2
+
+        if profile is not None:
+            profile.add('step test', testTime)
+
+        pointStatus = np.full(active.size, STATUS_MAXITERS, dtype=np.uint8)
+        pointStatus[converged] = STATUS_CONVERGED
+        pointStatus[diverged] = STATUS_DIVERGED
+        pointStatus[cycled] = STATUS_CYCLE
+        done = pointStatus != STATUS_MAXITERS
+        if n == maxIters:
+            done[:] = True
+
+        # store the points that just stopped and mask them out of the next pass
+        if done.any():
+            stopped = active[done]
+            zRe[stopped] = w.re[done]
+            zIm[stopped] = w.im[done]
+            numIters[stopped] = n
+            status[stopped] = pointStatus[done]
+            keep = ~done
+            active = active[keep]
+            w = ComplexGrid(w.re[keep], w.im[keep])
+            saved = ComplexGrid(saved.re[keep], saved.im[keep])
+
+    # roots are assigned once the iteration is over
+    with np.errstate(invalid='ignore'):
+        rootIndex = getCloseRootIndexGrid(ComplexGrid(zRe, zIm), rootList)[0]
+    zFinal = ComplexGrid(zRe, zIm).toArray()
+    return zFinal.reshape(shape), numIters.reshape(shape), rootIndex.reshape(shape), status.reshape(shape)
+
+# the termination modes iterateGrid can use
+terminationModes = ('distance', 'step', 'certified')
+
+def iterateGrid(z, fcn, maxIters, epsilon=.000000001, mode='distance'):
+    """runs the batched engine with a termination mode: 'distance' stops within epsilon of a root (newtonsNumItersGrid),
+    'step' stops when the newton step is smaller than epsilon, or on a cycle or divergence (newtonsStepGrid), and
+    'certified' gives the same iterations and roots as 'distance' but stops early inside the trust regions of the roots.
+    returns arrays of the final z, the number of iterations and the root index. in 'step' mode the points that didn't
+    converge report maxIters iterations, so they are colored the same as points that ran out of iterations"""
+    rootList = getFunction(fcn).roots
+    if mode == 'distance':
+        return newtonsNumItersGrid(z, fcn, rootList, maxIters, epsilon=epsilon)
+    if mode == 'certified':
+        return newtonsNumItersGrid(z, fcn, rootList, maxIters, epsilon=epsilon, certify=True)
+    if mode == 'step':
+        z, numIters, rootIndex, status = newtonsStepGrid(z, fcn, rootList, maxIters, epsilon)
+        numIters[status != STATUS_CONVERGED] = maxIters
+        return z, numIters, rootIndex
+    raise ValueError("unknown termination mode '{}' (use one of {})".format(mode, terminationModes))
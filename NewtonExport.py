@@ -0,0 +1,249 @@
+# NewtonExport.py
+# writes newtons fractals straight to PNG and PPM files, without a window or a tk PhotoImage.
+# the image is written in bands of rows, so only one band has to be in memory at a time and
+# the output can be much bigger than the explorer's window.
+# it also saves and loads the raw iteration data behind a frame (.nif files, described further down).
+
+# imports
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from NewtonRender import *
+
+
+class PNGWriter:
+
+    """Writes an RGB PNG file a few rows at a time. The rows are compressed with zlib as they come
+    in and written out in IDAT chunks, so the whole image is never held in memory."""
+
+    def __init__(self, path, width, height, level=6):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rowsWritten = 0
+        self.file = open(path, 'wb')
+        self.compressor = zlib.compressobj(level)
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        # 8 bits per channel, color type 2 (RGB), default compression and filtering, no interlacing
+        self._writeChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _writeChunk(self, kind, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    def writeRows(self, pixels):
+        """writes the next rows of the image, pixels is an array of packed 0xRRGGBB colors with one row per image row"""
+        rgb = getRGBBytes(pixels)
+        # every row starts with its filter type, 0 (none)
+        rows = np.zeros((rgb.shape[0], 1 + 3 * self.width), dtype=np.uint8)
+        rows[:, 1:] = rgb.reshape(rgb.shape[0], -1)
+        data = self.compressor.compress(rows.tobytes())
+        if data:
+            self._writeChunk(b'IDAT', data)
+        self.rowsWritten += rgb.shape[0]
+
+    def close(self):
+        """finishes the compressed data and the file"""
+        if self.file.closed:
+            return
+        self._writeChunk(b'IDAT', self.compressor.flush())
+        self._writeChunk(b'IEND', b'')
+        self.file.close()
+
+class PPMWriter:
+
+    """Writes a binary (P6) PPM file a few rows at a time."""
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rowsWritten = 0
+        self.file = open(path, 'wb')
+        self.file.write("P6\n{} {}\n255\n".format(width, height).encode('ascii'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def writeRows(self, pixels):
+        """writes the next rows of the image, pixels is an array of packed 0xRRGGBB colors with one row per image row"""
+        rgb = getRGBBytes(pixels)
+        self.file.write(rgb.tobytes())
+        self.rowsWritten += rgb.shape[0]
+
+    def close(self):
+        """closes the file"""
+        self.file.close()
+
+def getRGBBytes(pixels):
+    """unpacks an array of 0xRRGGBB colors into an array of [r, g, b] bytes (last axis)"""
+    pixels = np.asarray(pixels, dtype=np.uint32)
+    return np.stack([(pixels >> 16) & 0xff, (pixels >> 8) & 0xff, pixels & 0xff], axis=-1).astype(np.uint8)
+
+def openImageWriter(path, width, height):
+    """returns a PNGWriter or PPMWriter for path, depending on its extension (.png, or .ppm)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.png':
+        return PNGWriter(path, width, height)
+    if extension == '.ppm':
+        return PPMWriter(path, width, height)
+    raise ValueError("can only export .png and .ppm files, not '{}'".format(path))
+
+def getBands(numRows, bandRows):
+    """splits numRows sample rows into bands of at most bandRows rows, starting with the top band (the top row of the image).
+    returns a list of (row0, row1)"""
+    return [(max(row1 - bandRows, 0), row1) for row1 in range(numRows, 0, -bandRows)]
+
+def writeSamples(writer, palette, rootIndex, iters, resolution=1):
+    """writes a whole RenderResult worth of samples (row 0 = bottom of the plane) to writer, band by band"""
+    numRows = rootIndex.shape[0]
+    for row0, row1 in getBands(numRows, max(1, 256 // resolution)):
+        block, x, y = getTileBlock(palette.getColors(rootIndex[row0:row1], iters[row0:row1]), row0, 0, writer.width, writer.height, resolution)
+        if block is not None:
+            writer.writeRows(block)
+
+def exportResult(path, result, colorscheme='1', multCol=5, gradient=True):
+    """writes an already computed RenderResult (like the frame on screen) to a PNG or PPM file at its own size, without any newton iterations"""
+    palette = getPalette(len(getFunction(result.fcn).roots), result.maxIters, colorscheme, multCol, gradient)
+    with openImageWriter(path, result.width, result.height) as writer:
+        writeSamples(writer, palette, result.rootIndex, result.iters, result.resolution)
+
+def exportPixelBuffer(path, buffer):
+    """writes a PixelBuffer (like the one renderNewtonFractal returns) to a PNG or PPM file"""
+    with openImageWriter(path, buffer.getWidth(), buffer.getHeight()) as writer:
+        for y in range(0, buffer.getHeight(), 256):
+            writer.writeRows(buffer.pixels[y:y + 256])
+
+def exportNewtonFractal(path, coords, fcn, maxIters, epsilon=.000000001, colorscheme='1', width=400, height=400,
+                        resolution=1, gradient=True, multCol=5, workers=1, bandRows=64, mode='distance'):
+    """renders the newtons fractal of function fcn over coords = [rm, im, rM, iM] straight into a width x height PNG or PPM file.
+    the plane is computed bandRows sample rows at a time (split into tiles for the process pool when workers != 1) and
+    each band is written as soon as it is done, so very large images only ever need one band in memory"""
+    rValues, iValues = getPlaneAxes(coords, width, height, resolution)
+    palette = getPalette(len(getFunction(fcn).roots), maxIters, colorscheme, multCol, gradient)
+    with openImageWriter(path, width, height) as writer:
+        for row0, row1 in getBands(len(iValues), bandRows):
+            colors = np.zeros((row1 - row0, len(rValues)), dtype=np.uint32)
+            for tileRow, col0, z, iters, rootIndex in renderTiles(rValues, iValues[row0:row1], fcn, maxIters, epsilon, workers, 64 if workers != 1 else None, mode):
+                colors[tileRow:tileRow + iters.shape[0], col0:col0 + iters.shape[1]] = palette.getColors(rootIndex, iters)
+            block, x, y = getTileBlock(colors, row0, 0, width, height, resolution)
+            if block is not None:
+                writer.writeRows(block)
+
+
+# raw iteration fields
+#
+# a .nif file holds the iteration data behind a frame so it can be analysed (or recolored) later without running
+# newtons method again. the layout is:
+#
+#   bytes 0-7     the magic string b"NEWTONIF"
+#   bytes 8-11    the length of the header in bytes (little endian uint32)
+#   bytes 12-     the header: utf-8 json with the version, the function (name, coefficients and roots as [re, im]
+#                 pairs), the iteration method and relaxation factor, coords, epsilon, maxIters, mode, symmetry (true if
+#                 mirrored samples were copied, see SymmetryPlan), width, height, resolution, numRows, numCols and "arrays"
+#   then          each array in "arrays", starting at its "offset" (a multiple of 64), in C order
+#
+# every entry of "arrays" has a name, a numpy dtype string and a shape (numRows, numCols). the arrays are
+# rootIndex ("|u1", the index of the closest root in the function's root list), iters ("<u4", the number of
+# newton iterations) and, if it was kept, z ("<c16", the final value of z). row 0 is the bottom row of samples
+# (the smallest imaginary part), like RenderResult. openIterationField maps the arrays with numpy.memmap, so
+# reading part of a field only reads that part of the file.
+
+iterationFieldMagic = b"NEWTONIF"
+iterationFieldVersion = 1
+iterationFieldTypes = {'rootIndex': '|u1', 'iters': '<u4', 'z': '<c16'}
+
+def saveIterationField(path, result):
+    """writes the iteration data of a RenderResult to a .nif file (the layout is described above)"""
+    fn = getFunction(result.fcn)
+    arrays = [('rootIndex', result.rootIndex), ('iters', result.iters)]
+    if result.z is not None:
+        arrays.append(('z', result.z))
+
+    header = {'version': iterationFieldVersion, 'function': str(fn),
+              'coefficients': [[complex(c).real, complex(c).imag] for c in fn.coefficients],
+              'roots': [[root.real, root.imag] for root in fn.roots], 'method': fn.method, 'relaxation': fn.relaxation,
+              'coords': [float(c) for c in result.coords], 'epsilon': result.epsilon, 'maxIters': result.maxIters, 'mode': result.mode,
+              'symmetry': result.symmetry, 'width': result.width, 'height': result.height, 'resolution': result.resolution,
+              'numRows': result.rootIndex.shape[0], 'numCols': result.rootIndex.shape[1], 'arrays': []}
+
+    # the offsets depend on the header length, so the header is laid out until it stops growing
+    headerBytes = b""
+    while True:
+        offset = getAlignedOffset(len(iterationFieldMagic) + 4 + len(headerBytes))
+        header['arrays'] = []
+        for name, array in arrays:
+            header['arrays'].append({'name': name, 'dtype': iterationFieldTypes[name], 'shape': list(array.shape), 'offset': offset})
+            offset = getAlignedOffset(offset + array.size * np.dtype(iterationFieldTypes[name]).itemsize)
+        newHeaderBytes = json.dumps(header).encode('utf-8')
+        if len(newHeaderBytes) == len(headerBytes):
+            break
+        headerBytes = newHeaderBytes
+
+    with open(path, 'wb') as fieldFile:
+        fieldFile.write(iterationFieldMagic)
+        fieldFile.write(struct.pack('<I', len(headerBytes)))
+        fieldFile.write(headerBytes)
+        for (name, array), entry in zip(arrays, header['arrays']):
+            fieldFile.write(b'\0' * (entry['offset'] - fieldFile.tell()))
+            fieldFile.write(np.ascontiguousarray(array, dtype=iterationFieldTypes[name]).tobytes())
+
+def getAlignedOffset(offset, alignment=64):
+    """rounds offset up to a multiple of alignment"""
+    return -(-offset // alignment) * alignment
+
+def readIterationFieldHeader(path):
+    """returns the header (a dictionary) of a .nif file"""
+    with open(path, 'rb') as fieldFile:
+        if fieldFile.read(len(iterationFieldMagic)) != iterationFieldMagic:
+            raise ValueError("'{}' is not an iteration field (.nif) file".format(path))
+        headerLength, = struct.unpack('<I', fieldFile.read(4))
+        header = json.loads(fieldFile.read(headerLength).decode('utf-8'))
+    if header['version'] > iterationFieldVersion:
+        raise ValueError("'{}' was written by a newer version (iteration field version {})".format(path, header['version']))
+    return header
+
+def openIterationField(path, mode='r'):
+    """returns (header, arrays) for a .nif file, arrays is a dictionary of numpy.memmap arrays (nothing is read until it is used)"""
+    header = readIterationFieldHeader(path)
+    arrays = {}
+    for entry in header['arrays']:
+        arrays[entry['name']] = np.memmap(path, dtype=entry['dtype'], mode=mode, offset=entry['offset'], shape=tuple(entry['shape']))
+    return header, arrays
+
+def getFieldFunction(header):
+    """returns the registry index of the function (and iteration method) a .nif file was computed with, registering it if
+    it isn't there yet. (the roots are taken from the file so the root indexes mean the same thing)"""
+    coefficients = [complex(re, im) for re, im in header['coefficients']]
+    roots = [complex(re, im) for re, im in header['roots']]
+    method, relaxation = header.get('method', 'newton'), header.get('relaxation', 1.0)
+    for fcn, function in enumerate(functions):
+        if function.base is None and str(function) == header['function'] and function.roots == roots \
+           and [complex(c) for c in function.coefficients] == coefficients:
+            return getMethodFunction(fcn, method, relaxation)
+    return getMethodFunction(registerFunction(coefficients, name=header['function'], roots=roots), method, relaxation)
+
+def loadIterationField(path):
+    """returns a RenderResult backed by the memory mapped arrays of a .nif file (read only), ready to be recolored"""
+    header, arrays = openIterationField(path)
+    result = RenderResult(0, 0, header['coords'], getFieldFunction(header), header['maxIters'], header['epsilon'],
+                          header['width'], header['height'], header['resolution'], keepZ=False, mode=header.get('mode', 'distance'))
+    result.rootIndex = arrays['rootIndex']
+    result.iters = arrays['iters']
+    result.z = arrays.get('z')
+    # (files from before symmetry was stored were all computed without it)
+    result.symmetry = header.get('symmetry', False)
+    return result
@@ -0,0 +1,383 @@
+# NewtonFunctions.py
+# registry of the polynomials the Newtons Method Explorer can iterate.
+# a polynomial is given once (by its coefficients or by an expression in z) and the
+# registry works out everything else: f, f', the roots and the name in the function menu.
+
+# imports
+import ast
+import math
+import operator
+import numpy as np
+from numpy.polynomial import Polynomial
+
+# the most roots a function can have, the index of the root each sample went to is stored in a byte (uint8)
+maxRoots = 255
+
+
+class NewtonFunction:
+
+    """A polynomial for newtons method. It is given either by its coefficients (highest power
+    first, like numpy.roots) or by an expression in z such as "z*z*z*z-1". f and fprime are
+    compiled into plain python functions once, so calling them costs no dispatching and works
+    the same for complex numbers and ComplexGrids. step(z) does a whole newton step,
+    z - f(z) / f'(z), in one call. The roots are found numerically unless they are given.
+    symmetry is (conjugate, rotation): conjugate is true if newtons method commutes with
+    complex conjugation (real coefficients, so the basins are mirrored in the real axis) and
+    rotation is the largest n for which it commutes with turning the plane by 1/n of a turn
+    around 0 (p(wz) = w^k p(z) for w = e^(2 pi i / n)). It is worked out from the coefficients
+    unless it is given. method is the iteration method step uses (one of iterationMethods, newtons
+    method unless it is given), relaxation scales the step of the relaxed method and base is the
+    registry index of the newtons method function this one was made from (see getMethodFunction)."""
+
+    def __init__(self, coefficients=None, expression=None, name=None, roots=None, symmetry=None, method='newton', relaxation=1.0, base=None):
+        if expression is not None:
+            coefficients = expandExpression(expression)
+        if coefficients is None:
+            raise ValueError("a NewtonFunction needs coefficients or an expression")
+
+        # drop leading zeros and store real coefficients as floats
+        coefficients = [simplifyNumber(c) for c in coefficients]
+        while len(coefficients) > 1 and coefficients[0] == 0:
+            coefficients.pop(0)
+        if len(coefficients) < 2:
+            raise ValueError("newtons method needs a polynomial of degree 1 or more")
+        if len(coefficients) - 1 > maxRoots:
+            raise ValueError("a polynomial of degree {} has too many roots to color (the most is {})".format(len(coefficients) - 1, maxRoots))
+
+        self.coefficients = coefficients
+        self.degree = len(coefficients) - 1
+        self.expression = expression
+        self.name = name or expression or getPolynomialString(coefficients)
+        if roots is None:
+            roots = findRoots(coefficients)
+        self.roots = [complex(root) for root in roots]
+        if symmetry is None:
+            symmetry = findSymmetry(coefficients)
+        self.symmetry = (bool(symmetry[0]), int(symmetry[1]))
+        if method not in iterationMethods:
+            raise ValueError("unknown iteration method '{}' (use one of {})".format(method, ", ".join(iterationMethods)))
+        if method == 'relaxed' and not relaxation > 0:
+            raise ValueError("the relaxation factor has to be bigger than 0, not {}".format(relaxation))
+        self.method = method
+        self.relaxation = float(relaxation)
+        self.base = base
+        self._compile()
+
+    def __repr__(self):
+        return "NewtonFunction('{}')".format(self.name)
+
+    def __str__(self):
+        return self.name
+
+    def getMethodName(self):
+        """returns the name of the iteration method, with the relaxation factor for the relaxed method"""
+        if self.method == 'relaxed':
+            return "relaxed {:g}".format(self.relaxation)
+        return self.method
+
+    def _compile(self):
+        # f is compiled from the expression when there is one (so it does exactly the arithmetic
+        # written there), otherwise from the coefficients using horners scheme
+        fprimeCode = getHornerString(getDerivative(self.coefficients))
+        code = getExpressionCode(self.expression) if self.expression is not None else None
+        if code is not None:
+            self.f = compileFunction(code)
+            # keep the arithmetic of the expression in the step too, so the pictures don't change
+            self.step = compileFunction("z - (" + code + ") / (" + fprimeCode + ")")
+        else:
+            self.f = compileFunction(getHornerString(self.coefficients))
+            self.step = compileStep(self.coefficients)
+        if self.method != 'newton':
+            # the other methods step with one horner pass for p and its derivatives
+            self.step = compileStep(self.coefficients, self.method, self.relaxation)
+        self.fprime = compileFunction(fprimeCode)
+
+    # the compiled functions can't be pickled (to send to worker processes), so they are rebuilt
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['f']
+        del state['fprime']
+        del state['step']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+def simplifyNumber(c):
+    """returns c as a float if it has no imaginary part, otherwise as a complex number"""
+    c = complex(c)
+    if c.imag == 0:
+        return c.real
+    return c
+
+# the operators an expression in z can use
+expressionOperators = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+                       ast.Pow: operator.pow, ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+def parseExpression(expression):
+    """returns the ast tree of an expression in z, raising a ValueError if it isn't valid python"""
+    try:
+        return ast.parse(str(expression).strip(), mode='eval')
+    except SyntaxError as error:
+        raise ValueError("can't read the expression '{}' ({})".format(expression, error.msg))
+
+def getExpressionCode(expression):
+    """returns python code for an expression in z made back from its parsed tree (checked by expandExpression first),
+    so the code compiled is exactly what was checked, without comments or stray lines. None if the expression uses **,
+    which a ComplexGrid can't do (it is compiled from its coefficients instead)"""
+    tree = parseExpression(expression)
+    if any(isinstance(node, ast.Pow) for node in ast.walk(tree)):
+        return None
+    return ast.unparse(tree)
+
+def expandExpression(expression):
+    """returns the coefficients (highest power first) of a polynomial written as an expression in z. it is parsed, not
+    run, and only z, numbers, + - * / and ** (to a whole number) are allowed, anything else raises a ValueError"""
+    tree = parseExpression(expression)
+    try:
+        poly = evaluateExpression(tree.body)
+    except (ArithmeticError, TypeError) as error:
+        raise ValueError("can't work out the expression '{}' ({})".format(expression, error))
+    if not isinstance(poly, Polynomial):
+        poly = Polynomial([poly])
+    return list(poly.coef[::-1])
+
+def evaluateExpression(node):
+    """works out a node of a parsed expression in z as a Polynomial (or a number), see expandExpression"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float, complex):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id != "z":
+            raise ValueError("unknown name '{}' in the expression (the variable is z)".format(node.id))
+        return Polynomial([0, 1])
+    if isinstance(node, ast.UnaryOp) and type(node.op) in expressionOperators:
+        return expressionOperators[type(node.op)](evaluateExpression(node.operand))
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitXor):
+        raise ValueError("^ isn't a power in an expression, write z^3 as z**3 or z*z*z")
+    if not (isinstance(node, ast.BinOp) and type(node.op) in expressionOperators):
+        raise ValueError("'{}' isn't allowed in an expression (only z, numbers, + - * / and **)".format(ast.unparse(node)))
+
+    left = evaluateExpression(node.left)
+    right = evaluateExpression(node.right)
+    if isinstance(node.op, ast.Div) and isinstance(right, Polynomial):
+        raise ValueError("an expression can only be divided by a number, not by '{}'".format(ast.unparse(node.right)))
+    if isinstance(node.op, ast.Pow):
+        if isinstance(left, Polynomial) and not (type(right) is int and right >= 0):
+            raise ValueError("z can only be raised to a whole number, not '{}'".format(ast.unparse(node.right)))
+        # (checked first so a huge power isn't worked out only to be refused)
+        if isinstance(left, Polynomial) and (left.degree() * right > maxRoots):
+            raise ValueError("the expression has more than {} roots".format(maxRoots))
+        if isinstance(left, Polynomial):
+            # (Polynomial refuses powers over 100)
+            value = Polynomial([1])
+            for n in range(right):
+                value = value * left
+            return value
+        if type(left) is int and type(right) is int:
+            # a power of whole numbers is worked out in floats, so a huge one overflows instead of taking forever
+            left = float(left)
+    value = expressionOperators[type(node.op)](left, right)
+    if isinstance(value, Polynomial) and value.degree() > maxRoots:
+        raise ValueError("the expression has more than {} roots".format(maxRoots))
+    return value
+
+def getDerivative(coefficients):
+    """returns the coefficients of the derivative of a polynomial"""
+    degree = len(coefficients) - 1
+    return [simplifyNumber(c * (degree - k)) for k, c in enumerate(coefficients[:-1])]
+
+def getTaylorCoefficients(coefficients, center):
+    """returns the coefficients c of the polynomial around center, p(center + h) = c[0] + c[1] h + c[2] h^2 + ...
+    (lowest power first), by repeated synthetic division by (z - center)"""
+    center = complex(center)
+    remaining = [complex(c) for c in coefficients]
+    taylor = []
+    while remaining:
+        quotient = [remaining[0]]
+        for c in remaining[1:]:
+            quotient.append(c + quotient[-1] * center)
+        taylor.append(quotient.pop())
+        remaining = quotient
+    return taylor
+
+def getHornerString(coefficients):
+    """returns python code for the polynomial in z using horners scheme, skipping the zero coefficients
+    (so 4z^3 becomes ((4.0 * z) * z) * z, the same arithmetic as writing it out by hand)"""
+    code = "z" if coefficients[0] == 1 and len(coefficients) > 1 else repr(coefficients[0])
+    for k, c in enumerate(coefficients[1:]):
+        if k > 0 or code != "z":
+            code = "(" + code + ") * z"
+        if c == 0:
+            continue
+        if isinstance(c, float) and c < 0:
+            code = code + " - " + repr(-c)
+        else:
+            code = code + " + " + repr(c)
+    return code
+
+def getPolynomialString(coefficients):
+    """returns a readable name like z^4 - 1 for a polynomial"""
+    degree = len(coefficients) - 1
+    terms = []
+    for k, c in enumerate(coefficients):
+        power = degree - k
+        if c == 0:
+            continue
+        number = "{:g}".format(c) if isinstance(c, float) else str(c)
+        if power > 0 and c == 1:
+            number = ""
+        elif power > 0 and c == -1:
+            number = "-"
+        variable = "" if power == 0 else ("z" if power == 1 else "z^" + str(power))
+        terms.append(number + variable)
+    return " + ".join(terms).replace("+ -", "- ")
+
+def compileFunction(code):
+    """compiles python code for a function of z (only arithmetic on z is allowed) into a function"""
+    return eval("lambda z: " + code, {"__builtins__": {}})
+
+def getStepString(coefficients):
+    """returns python code for a newton step that works out p(z) and p'(z) together in one horner pass.
+    p and dp are the running values of the polynomial and its derivative, zero coefficients are skipped"""
+    lines = ["p = " + ("z" if coefficients[0] == 1 else repr(coefficients[0]) + " * z")]
+    lines.append("dp = " + repr(coefficients[0]))
+    if len(coefficients) > 1 and coefficients[1] != 0:
+        lines[0] += " + " + repr(coefficients[1])
+    for c in coefficients[2:]:
+        lines.append("dp = dp * z + p")
+        lines.append("p = p * z" + ("" if c == 0 else " + " + repr(c)))
+    lines.append("return z - p / dp")
+    return "\n".join(lines)
+
+# the iteration methods a NewtonFunction can step with, and the order of the householder method each one is. newton,
+# halley and householder3 and 4 converge with order 2, 3, 4 and 5 near a simple root, relaxed is newtons method with its
+# step scaled by the relaxation factor (damped below 1, so it only converges linearly unless the factor is 1)
+iterationMethods = ('newton', 'relaxed', 'halley', 'householder3', 'householder4')
+householderOrders = {'newton': 1, 'relaxed': 1, 'halley': 2, 'householder3': 3, 'householder4': 4}
+
+def getMethodStepString(coefficients, method='newton', relaxation=1.0):
+    """returns python code for one step of an iteration method. newton is getStepString and relaxed scales its step.
+    the householder method of order d steps by d f u(d-1) / u(d), where u(n) = f^(n+1) (1/f)^(n) comes from the
+    recurrence u(n) = -sum n!/(n-k)! t(k) f^(k-1) u(n-k) for k = 1..n (u(0) = 1), and t(k) = f^(k)(z) / k! are
+    worked out together in one horner pass. (order 1 is newtons method, order 2 is halleys method)"""
+    if method == 'newton':
+        return getStepString(coefficients)
+    if method == 'relaxed':
+        return getStepString(coefficients).replace("return z - p / dp", "return z - {!r} * (p / dp)".format(float(relaxation)))
+
+    order = householderOrders[method]
+    degree = len(coefficients) - 1
+    # t(j) only becomes nonzero once j coefficients have been taken in
+    lines = ["t0 = " + repr(coefficients[0])]
+    for k, c in enumerate(coefficients[1:], 1):
+        for j in range(min(k, order), 0, -1):
+            lines.append("t{} = t{}".format(j, j - 1) if j == k else "t{} = t{} * z + t{}".format(j, j, j - 1))
+        if c == 0:
+            lines.append("t0 = t0 * z")
+        elif isinstance(c, float) and c < 0:
+            lines.append("t0 = t0 * z - " + repr(-c))
+        else:
+            lines.append("t0 = t0 * z + " + repr(c))
+    for k in range(2, min(order, degree)):
+        lines.append("f{} = {} * t0".format(k, "t0" if k == 2 else "f{}".format(k - 1)))
+
+    for n in range(1, order + 1):
+        terms = []
+        for k in range(1, min(n, degree) + 1):
+            factors = [str(math.perm(n, k))] if math.perm(n, k) != 1 else []
+            factors.append("t{}".format(k))
+            if k > 1:
+                factors.append("t0" if k == 2 else "f{}".format(k - 1))
+            if n > k:
+                factors.append("u{}".format(n - k))
+            terms.append(" * ".join(factors))
+        lines.append("u{} = -({})".format(n, " + ".join(terms)))
+    lines.append("return z + {} * t0{} / u{}".format(order, "" if order == 1 else " * u{}".format(order - 1), order))
+    return "\n".join(lines)
+
+def compileStep(coefficients, method='newton', relaxation=1.0):
+    """compiles one step of an iteration method (newtons method unless it is given) for a polynomial into a function of z"""
+    code = "def step(z):\n    " + getMethodStepString(coefficients, method, relaxation).replace("\n", "\n    ")
+    namespace = {}
+    exec(code, {"__builtins__": {}}, namespace)
+    return namespace['step']
+
+def findSymmetry(coefficients):
+    """returns the (conjugate, rotation) symmetry of a polynomial: conjugate is true if every coefficient is real and
+    rotation is the gcd of the differences between the powers with nonzero coefficients (1 if there is no rotation)"""
+    degree = len(coefficients) - 1
+    powers = [degree - k for k, c in enumerate(coefficients) if c != 0]
+    rotation = 0
+    for power in powers[1:]:
+        rotation = math.gcd(rotation, powers[0] - power)
+    return all(complex(c).imag == 0 for c in coefficients), max(rotation, 1)
+
+def findRoots(coefficients, polishSteps=5, tolerance=.000001):
+    """returns the distinct roots of a polynomial, found with numpy.roots and polished with a few newton steps"""
+    f = compileFunction(getHornerString(coefficients))
+    fprime = compileFunction(getHornerString(getDerivative(coefficients)))
+    roots = []
+    for root in np.roots(coefficients):
+        root = complex(root)
+        for n in range(polishSteps):
+            d = fprime(root)
+            if d == 0:
+                break
+            root = root - f(root) / d
+        # repeated roots only count once
+        if all(abs(root - other) > tolerance for other in roots):
+            roots.append(root)
+    roots.sort(key=lambda root: (round(root.real, 9), round(root.imag, 9)))
+    return roots
+
+
+# global list of the registered functions, and a list of their roots (roots[i] are the roots of functions[i])
+functions = []
+roots = []
+
+def registerFunction(coefficients=None, expression=None, name=None, roots=None, symmetry=None, method='newton', relaxation=1.0, base=None):
+    """adds a polynomial to the registry and returns its index"""
+    function = NewtonFunction(coefficients, expression, name, roots, symmetry, method, relaxation, base)
+    functions.append(function)
+    globals()['roots'].append(function.roots)
+    return len(functions) - 1
+
+# the functions registered for the other iteration methods, so each one is only registered once
+_methodFunctions = {}
+
+def getMethodFunction(fcn, method='newton', relaxation=1.0):
+    """returns the registry index of the function fcn (an index) stepping with an iteration method (one of iterationMethods),
+    registering it the first time. it has the same name, roots and symmetry as fcn, so the fractals of the methods are
+    colored the same, and as it is a function of its own every engine (and the frame cache) works with it unchanged"""
+    function = getFunction(fcn)
+    base = fcn if function.base is None else function.base
+    if method == 'newton':
+        return base
+    relaxation = float(relaxation) if method == 'relaxed' else 1.0
+    key = (base, method, relaxation)
+    if key not in _methodFunctions:
+        function = functions[base]
+        _methodFunctions[key] = registerFunction(function.coefficients, function.expression, function.name, function.roots,
+                                                 function.symmetry, method, relaxation, base)
+    return _methodFunctions[key]
+
+def getMenuFunctions():
+    """returns the registry indexes of the functions in the function menu: the newtons method ones, not the
+    functions registered for the other iteration methods (those are picked with the method instead)"""
+    return [fcn for fcn, function in enumerate(functions) if function.base is None]
+
+def getFunction(fcn):
+    """returns the NewtonFunction for fcn, which is either an index in the registry or a NewtonFunction"""
+    if isinstance(fcn, NewtonFunction):
+        return fcn
+    return functions[fcn]
+
+
+# the built in functions (their roots are given so their order, and so their colors, stay the same)
+#   0. (z-1)(z+1), real and even
+registerFunction(expression="(z - 1) * (z + 1)", name="(z-1)*(z+1)", roots=[complex(1, 0), complex(-1, 0)], symmetry=(True, 2))
+#   1. z(z-1)(z+1), real and odd
+registerFunction(expression="z * (z - 1) * (z + 1)", name="z*(z*z-1)", roots=[complex(0, 0), complex(1, 0), complex(-1, 0)], symmetry=(True, 2))
+#   2. z^4 - 1, real and the same after a quarter turn
+registerFunction(expression="z * z * z * z - 1", name="z*z*z*z-1", roots=[complex(1, 0), complex(-1, 0), complex(0, 1), complex(0, -1)], symmetry=(True, 4))
@@ -0,0 +1,128 @@
+# NewtonProfile.py
+# optional timers and counters for the stages of a render (newton steps, root search, coloring,
+# drawing, ...). nothing is measured unless a RenderProfile has been started with startProfile, and
+# while none is running every instrumented spot only costs a call to getProfile.
+
+# imports
+import json
+import os
+import threading
+import time
+import numpy as np
+
+
+class RenderProfile:
+
+    """The time spent in each stage of one render, how many times each stage ran, and counters like
+    the number of draw calls. addResult adds the counters that come from the finished iteration data
+    (newton steps, samples that hit maxIters, average iterations per root). With trace on, every stage
+    is also kept as an event for writeTrace (the chrome://tracing / perfetto json format)."""
+
+    def __init__(self, name="render", trace=False):
+        self.name = name
+        self.trace = trace
+        self.startTime = time.perf_counter()
+        self.endTime = None
+        self.times = {}
+        self.calls = {}
+        self.counters = {}
+        self.events = []
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return "RenderProfile('{}', {} stages)".format(self.name, len(self.times))
+
+    def add(self, stage, startTime, endTime=None):
+        """adds the time from startTime (a time.perf_counter()) until endTime (default now) to stage"""
+        if endTime is None:
+            endTime = time.perf_counter()
+        with self.lock:
+            self.times[stage] = self.times.get(stage, 0.0) + endTime - startTime
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            if self.trace:
+                self.events.append((stage, startTime, endTime, threading.get_ident()))
+
+    def count(self, counter, n=1):
+        """adds n to a counter"""
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def addStages(self, times, calls, events=()):
+        """adds the stages recorded by another profile (like the one a worker process kept for a tile, see runProfiled)"""
+        with self.lock:
+            for stage in times:
+                self.times[stage] = self.times.get(stage, 0.0) + times[stage]
+                self.calls[stage] = self.calls.get(stage, 0) + calls[stage]
+            if self.trace:
+                # (perf_counter is the same clock in every process, so the events line up with this profile's)
+                self.events.extend(tuple(event) for event in events)
+
+    def addResult(self, rootIndex, iters, maxIters):
+        """adds the counters that can be read off the finished iteration data of a render"""
+        iters = np.asarray(iters)
+        rootIndex = np.asarray(rootIndex)
+        self.count('samples', int(iters.size))
+        self.count('newton steps', int(iters.sum(dtype=np.int64)))
+        self.count('samples at maxIters', int((iters >= maxIters).sum()))
+        for root in np.unique(rootIndex):
+            inBasin = iters[rootIndex == root]
+            self.counters['mean iters, root ' + str(int(root))] = float(inBasin.mean())
+
+    def stop(self):
+        """marks the end of the render"""
+        self.endTime = time.perf_counter()
+
+    def getSeconds(self):
+        return (self.endTime or time.perf_counter()) - self.startTime
+
+    def getSummary(self):
+        """returns a table of the stages and counters"""
+        lines = ["{} profile: {:.3f}s total".format(self.name, self.getSeconds())]
+        for stage in sorted(self.times, key=self.times.get, reverse=True):
+            lines.append("  {:<16} {:9.3f}s {:8} calls".format(stage, self.times[stage], self.calls[stage]))
+        for counter in self.counters:
+            value = self.counters[counter]
+            lines.append("  {:<24} {}".format(counter, round(value, 2) if isinstance(value, float) else value))
+        return "\n".join(lines)
+
+    def writeTrace(self, path):
+        """writes the stages as a chrome trace (open it in chrome://tracing or ui.perfetto.dev), with the counters and totals"""
+        events = [{'name': stage, 'ph': 'X', 'pid': 1, 'tid': thread, 'ts': (start - self.startTime) * 1e6, 'dur': (end - start) * 1e6}
+                  for stage, start, end, thread in self.events]
+        with open(path, 'w') as traceFile:
+            json.dump({'traceEvents': events, 'name': self.name, 'seconds': self.getSeconds(), 'stages': self.times,
+                       'calls': self.calls, 'counters': self.counters}, traceFile, indent=1)
+
+# the profile being recorded (None while profiling is off)
+_profile = None
+
+def startProfile(name="render", trace=False):
+    """starts recording a new RenderProfile and returns it"""
+    global _profile
+    _profile = RenderProfile(name, trace)
+    return _profile
+
+def stopProfile():
+    """stops recording and returns the profile that was being recorded (or None)"""
+    global _profile
+    profile = _profile
+    _profile = None
+    if profile is not None:
+        profile.stop()
+    return profile
+
+def getProfile():
+    """returns the RenderProfile being recorded, or None if profiling is off"""
+    return _profile
+
+def runProfiled(function, *args):
+    """runs function(*args) while recording a RenderProfile of its own (in a worker process) and returns (result, stages),
+    where stages are the (times, calls, events) of that profile for RenderProfile.addStages in the parent process"""
+    profile = startProfile(trace=True)
+    try:
+        result = function(*args)
+    finally:
+        stopProfile()
+    # (the events are tagged with the worker's process id, so each worker gets its own row in a trace)
+    events = [(stage, start, end, os.getpid()) for stage, start, end, thread in profile.events]
+    return result, (profile.times, profile.calls, events)
@@ -0,0 +1,1240 @@
+# NewtonRender.py
+# coloring and headless rendering for the Newtons Method Explorer.
+# nothing in here opens a window, so a fractal can be rendered straight into
+# an in-memory PixelBuffer on a machine without a display.
+
+# imports
+import colorsys
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import DEgraphics
+from DEgraphics import color_rgb
+from NewtonEngine import *
+from NewtonProfile import *
+
+# global list to hold colors for the various roots
+colors = [[0, 255, 0], [255, 0, 0], [0, 0, 255], [255, 255, 0], [255, 0, 255], [0, 255, 255]]
+
+
+def getRootColor(rootNum):
+    """returns the [r, g, b] color of root number rootNum. the first roots get the colors list, the roots past
+    the end of it go around the hue circle (in golden ratio steps, so roots next to each other get different hues)"""
+    if rootNum < len(colors):
+        return colors[rootNum]
+    hue = (1 / 12 + (rootNum - len(colors)) * 0.618033988749895) % 1
+    return [int(round(255 * c)) for c in colorsys.hsv_to_rgb(hue, .85, 1)]
+
+def getRootColors(numRoots):
+    """returns an (n, 3) array of the root colors, covering at least numRoots roots"""
+    return np.array([getRootColor(n) for n in range(max(int(numRoots), len(colors)))], dtype=np.int64)
+
+
+def getColorGradient(z, fcn, numIters, maxIters, colorscheme='1', multCol=5):
+    """returns a color scheme based on the number of iterations"""
+    # note: I was going to add the ability to add different color schemes but I realized that this one is the best. You can change it by changing the default color scheme in the function if you want.
+    if colorscheme == '1':
+        # get the color of the close root
+        closeRoot = getCloseRootIndex(z, getFunction(fcn).roots)
+        rootColor = getRootColor(closeRoot)
+        color = [0, 0, 0]  # THIS IS THE FINAL COLOR
+        # go through each rgb value
+        for i in range(3):
+            # this transformation:
+                # if rootColor[i] is 0 then the whole thing will stay 0, otherwise it will scale to 255
+                # multCol expands the distance between each color
+                # 255 - ... inverts the color scheme
+            color[i] = (255 - abs(int(numIters / maxIters * multCol * rootColor[i]))) % 255
+        return color_rgb(color[0], color[1], color[2])
+
+    # THESE ARE OTHER COLOR SCHEMES I DEVELOPED (MOST ARE GRAYSCALES BUT WORTH A LOOK) (most are similar to the one above)
+    if colorscheme == '2':
+        color = getRootColor(getCloseRootIndex(z, getFunction(fcn).roots))
+        for i in range(3):
+            color[i] = (int(255 - float(numIters) / maxIters * 10000)) % 255  # gradient from light to dark
+        return color_rgb(color[0], color[1], color[2])
+
+    if colorscheme == '3':
+        # THIS IS AN AMAZING GRAYSCALE!!!
+        color = getRootColor(getCloseRootIndex(z, getFunction(fcn).roots))
+        for i in range(3):
+            color[i] = (255 - numIters) * 10 % 255
+        return color_rgb(color[0], color[1], color[2])
+
+    if colorscheme == '4':
+        color2 = getRootColor(getCloseRootIndex(z, getFunction(fcn).roots))
+        color = [0, 0, 0]  # new color
+        for i in range(3):
+            if color2[i] == 255:
+                color[i] = abs((color2[i] - (numIters * 10000 % 255)) % 255)
+        return color_rgb(color[0], color[1], color[2])
+
+    if colorscheme == '5':
+        color2 = getRootColor(getCloseRootIndex(z, getFunction(fcn).roots))
+        color = [0, 0, 0]  # new color
+        for i in range(3):
+            # if color2[i] == 255:
+                color[i] = int((float(numIters) / maxIters) * 10000) % 255
+        return color_rgb(color[0], color[1], color[2])
+
+    if colorscheme == '6':
+        color2 = getRootColor(getCloseRootIndex(z, getFunction(fcn).roots))
+        color = [0, 0, 0]  # new color
+        for i in range(3):
+            color[i] = abs(int((((color2[i] * multCol) / maxIters) * multCol * numIters + color2[i]) % 255))
+        return color_rgb(color[0], color[1], color[2])
+
+def getColorOfCloseRoot(z, rootList):
+    """returns the color of the closet root to z"""
+    closeRoot = 0
+    minD = abs(z - rootList[closeRoot])
+    for rootNum in range(0, len(rootList)):
+        d = abs(z - rootList[rootNum])
+        if d < minD:
+            minD = d
+            closeRoot = rootNum
+    color = getRootColor(closeRoot)
+    return color_rgb(color[0], color[1], color[2])
+
+
+def getColorGradientGrid(rootIndex, iters, maxIters, colorscheme='1', multCol=5):
+    """vectorized getColorGradient: returns the packed 0xRRGGBB color of every sample from its root index and
+    number of iterations (no newton iterations or root searches needed). gives the same colors as getColorGradient,
+    except that schemes 2 and 3 don't overwrite the global root colors the way the per-pixel version does"""
+    n = np.asarray(iters, dtype=np.int64)
+    rootIndex = np.asarray(rootIndex)
+    rootColor = getRootColors(np.max(rootIndex, initial=0) + 1)[rootIndex]  # shape (..., 3)
+    n3 = n[..., np.newaxis]
+    # (a maxIters of 0 would divide by zero in getColorGradient)
+    maxIters = max(maxIters, 1)
+
+    if colorscheme == '1':
+        color = (255 - np.abs(np.trunc(n3 / maxIters * multCol * rootColor).astype(np.int64))) % 255
+
+    elif colorscheme == '2':
+        # grayscale (the same value for red, green and blue)
+        color = np.repeat(np.trunc(255 - n3 / maxIters * 10000).astype(np.int64) % 255, 3, axis=-1)
+
+    elif colorscheme == '3':
+        color = np.repeat((255 - n3) * 10 % 255, 3, axis=-1)
+
+    elif colorscheme == '4':
+        color = np.where(rootColor == 255, np.abs((rootColor - (n3 * 10000 % 255)) % 255), 0)
+
+    elif colorscheme == '5':
+        color = np.repeat(np.trunc(n3 / maxIters * 10000).astype(np.int64) % 255, 3, axis=-1)
+
+    elif colorscheme == '6':
+        color = np.abs(np.trunc((((rootColor * multCol) / maxIters) * multCol * n3 + rootColor) % 255).astype(np.int64))
+
+    else:
+        raise ValueError("unknown color scheme " + str(colorscheme))
+
+    return packColors(color)
+
+def getColorOfCloseRootGrid(rootIndex):
+    """vectorized getColorOfCloseRoot: returns the packed 0xRRGGBB color of the root of every sample"""
+    rootIndex = np.asarray(rootIndex)
+    return packColors(getRootColors(np.max(rootIndex, initial=0) + 1)[rootIndex])
+
+def packColors(rgb):
+    """packs an array of [r, g, b] values (last axis) into 0xRRGGBB ints"""
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+def getColorStrings(packed):
+    """returns an array holding the color string (like color_rgb returns) for every packed color.
+    each different color is only formatted once"""
+    packed = np.asarray(packed)
+    unique, inverse = np.unique(packed, return_inverse=True)
+    strings = np.array(["#%06x" % color for color in unique.tolist()], dtype=object)
+    return strings[inverse].reshape(packed.shape)
+
+class Palette:
+
+    """A lookup table holding the packed color for every (root index, number of iterations) pair,
+    one row per root and one column per iteration count from 0 to maxIters. Coloring a sample is
+    then a single indexed lookup instead of color math and string formatting for every pixel."""
+
+    def __init__(self, numRoots, maxIters, colorscheme='1', multCol=5, gradient=True):
+        self.numRoots = numRoots
+        self.maxIters = maxIters
+        self.colorscheme = colorscheme
+        self.multCol = multCol
+        self.gradient = gradient
+
+        rootIndex = np.arange(numRoots)[:, np.newaxis]
+        iters = np.arange(maxIters + 1)[np.newaxis, :]
+        if gradient:
+            self.table = getColorGradientGrid(rootIndex, iters, maxIters, colorscheme, multCol)
+        else:
+            self.table = np.repeat(getColorOfCloseRootGrid(rootIndex), maxIters + 1, axis=1)
+        # the Tk color strings are only made if they are asked for
+        self.strings = None
+
+    def __repr__(self):
+        return "Palette({}, {}, '{}', {}, {})".format(self.numRoots, self.maxIters, self.colorscheme, self.multCol, self.gradient)
+
+    def getColors(self, rootIndex, iters):
+        """returns the packed 0xRRGGBB colors for arrays of root indexes and iteration counts"""
+        profile = getProfile()
+        if profile is None:
+            return self.table[rootIndex, iters]
+        startTime = time.perf_counter()
+        colors = self.table[rootIndex, iters]
+        profile.add('colors', startTime)
+        return colors
+
+    def getColorStrings(self, rootIndex, iters):
+        """returns the color strings (like color_rgb returns) for arrays of root indexes and iteration counts"""
+        profile = getProfile()
+        if profile is not None:
+            startTime = time.perf_counter()
+        if self.strings is None:
+            self.strings = getColorStrings(self.table)
+        strings = self.strings[rootIndex, iters]
+        if profile is not None:
+            profile.add('color strings', startTime)
+        return strings
+
+# palettes that have already been built, so they are only rebuilt when one of their inputs changes
+# (locked, since the render thread and the main thread both use them)
+_palettes = {}
+_palettesLock = threading.Lock()
+maxPalettes = 16
+
+def getPalette(numRoots, maxIters, colorscheme='1', multCol=5, gradient=True):
+    """returns the Palette for these settings, building it only if it isn't cached already"""
+    # the root colors are part of the key in case the global colors list was changed
+    key = (numRoots, maxIters, colorscheme, multCol, gradient, tuple(map(tuple, getRootColors(numRoots)[:numRoots].tolist())))
+    with _palettesLock:
+        if key not in _palettes:
+            if len(_palettes) >= maxPalettes:
+                del _palettes[next(iter(_palettes))]
+            _palettes[key] = Palette(numRoots, maxIters, colorscheme, multCol, gradient)
+        return _palettes[key]
+
+class PixelBuffer:
+
+    """An in-memory image holding one packed 0xRRGGBB color per pixel.
+    Row 0 is the top of the image, the same as a window or an image file."""
+
+    def __init__(self, width, height, background=0x000000):
+        self.width = int(width)
+        self.height = int(height)
+        self.pixels = np.full((self.height, self.width), background, dtype=np.uint32)
+
+    def __repr__(self):
+        return "PixelBuffer({}, {})".format(self.width, self.height)
+
+    def getWidth(self):
+        """Returns the width of the buffer in pixels"""
+        return self.width
+
+    def getHeight(self):
+        """Returns the height of the buffer in pixels"""
+        return self.height
+
+    def getPixel(self, x, y):
+        """Returns a list [r,g,b] with the RGB color values for pixel (x,y)"""
+        value = int(self.pixels[y, x])
+        return [(value >> 16) & 255, (value >> 8) & 255, value & 255]
+
+    def setPixel(self, x, y, color):
+        """Sets pixel (x,y) to the given color string (like color_rgb returns)"""
+        self.pixels[y, x] = int(color[1:], 16)
+
+    def getRGB(self):
+        """Returns the pixels as a (height, width, 3) array of uint8 red, green and blue values"""
+        rgb = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        rgb[:, :, 0] = self.pixels >> 16
+        rgb[:, :, 1] = self.pixels >> 8
+        rgb[:, :, 2] = self.pixels
+        return rgb
+
+    def setSamples(self, samples, row0=0, col0=0, resolution=1):
+        """fills in the pixels covered by a grid (or tile) of sample colors, see getTileBlock"""
+        block, x, y = getTileBlock(samples, row0, col0, self.width, self.height, resolution)
+        if block is not None:
+            self.pixels[y:y + block.shape[0], x:x + block.shape[1]] = block
+
+class RenderResult:
+
+    """The raw iteration data behind one rendered frame, kept so the frame can be recolored without
+    running newtons method again: the index of the closest root (uint8) and the number of iterations
+    (uint16, or uint32 for more than 65535 iterations) for every sample, optionally the final z, plus
+    the parameters it was computed with. Sample row 0 is the bottom of the plane (like getPlaneAxes)."""
+
+    def __init__(self, numRows, numCols, coords, fcn, maxIters, epsilon, width, height, resolution=1, keepZ=True, mode='distance'):
+        itersType = np.uint16 if maxIters <= np.iinfo(np.uint16).max else np.uint32
+        self.rootIndex = np.zeros((numRows, numCols), dtype=np.uint8)
+        self.iters = np.zeros((numRows, numCols), dtype=itersType)
+        self.z = np.zeros((numRows, numCols), dtype=complex) if keepZ else None
+        self.coords = list(coords)
+        self.fcn = fcn
+        self.maxIters = maxIters
+        self.epsilon = epsilon
+        # the termination mode of iterateGrid ('distance', 'step' or 'certified')
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self.resolution = resolution
+        # false while some samples haven't been computed (a progressive render that was stopped early)
+        self.complete = True
+        # false if some samples were filled in instead of computed (adaptive subdivision), so their z can't be carried on
+        self.exact = True
+        # true if it was rendered with symmetry on (samples that are mirror images of others copied from them, see SymmetryPlan)
+        self.symmetry = False
+
+    def __repr__(self):
+        return "RenderResult({}, {}, {})".format(self.coords, self.iters.shape[0], self.iters.shape[1])
+
+    def getParams(self):
+        """returns the parameters the samples were computed with, keyed like RenderScheduler.computeKeys"""
+        return {'coords': tuple(self.coords), 'fcn': self.fcn, 'maxIters': self.maxIters, 'epsilon': self.epsilon, 'mode': self.mode,
+                'resolution': self.resolution, 'width': self.width, 'height': self.height, 'symmetry': self.symmetry}
+
+    def setSamples(self, row0, col0, z, iters, rootIndex, colStep=1):
+        """stores a tile of computed samples whose bottom-left sample is (row0, col0).
+        colStep > 1 stores every colStep-th column (used for the interleaved columns of one sweep)"""
+        rows = slice(row0, row0 + z.shape[0])
+        cols = slice(col0, col0 + (z.shape[1] - 1) * colStep + 1, colStep)
+        if self.z is not None:
+            self.z[rows, cols] = z
+        self.iters[rows, cols] = iters
+        self.rootIndex[rows, cols] = rootIndex
+
+    def setPoints(self, rows, cols, z, iters, rootIndex):
+        """stores samples computed at scattered positions (rows[k], cols[k])"""
+        if self.z is not None:
+            self.z[rows, cols] = z
+        self.iters[rows, cols] = iters
+        self.rootIndex[rows, cols] = rootIndex
+
+    def getBytes(self):
+        """returns the number of bytes of sample data held"""
+        return self.rootIndex.nbytes + self.iters.nbytes + (self.z.nbytes if self.z is not None else 0)
+
+    def resample(self, rValues, iValues):
+        """returns (rootIndex, iters) arrays for the starting points made from rValues and iValues, using the nearest
+        stored sample for each one (a quick preview of a zoomed in frame made from the frame it was zoomed from).
+        points outside of this frame get root 0 and 0 iterations"""
+        rm, im, rM, iM = self.coords
+        rstep = self.resolution * (rM - rm) / self.width
+        istep = self.resolution * (iM - im) / self.height
+        cols = np.rint((np.asarray(rValues) - rm) / rstep).astype(np.int64)
+        rows = np.rint((np.asarray(iValues) - im) / istep).astype(np.int64)
+        inside = ((rows >= 0) & (rows < self.iters.shape[0]))[:, np.newaxis] & ((cols >= 0) & (cols < self.iters.shape[1]))[np.newaxis, :]
+        rows = np.clip(rows, 0, self.iters.shape[0] - 1)[:, np.newaxis]
+        cols = np.clip(cols, 0, self.iters.shape[1] - 1)[np.newaxis, :]
+        return np.where(inside, self.rootIndex[rows, cols], 0), np.where(inside, self.iters[rows, cols], 0)
+
+class RenderJob:
+
+    """Runs one of the render generators (renderTiles, renderProgressive, renderAdaptive) on a background thread
+    so the windows stay responsive. Each item the generator yields is put in a queue that the main thread empties
+    with getItems (tk can only be used from the main thread). cancel() stops the job after the item it is working on."""
+
+    def __init__(self, render):
+        self.render = render
+        self.items = queue.Queue()
+        self.cancelled = threading.Event()
+        self.finished = False
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __repr__(self):
+        return "RenderJob(finished={}, cancelled={})".format(self.finished, self.isCancelled())
+
+    def _run(self):
+        try:
+            for item in self.render:
+                if self.cancelled.is_set():
+                    break
+                self.items.put(item)
+        except Exception as error:
+            self.error = error
+        finally:
+            # closing the generator runs its cleanup (like cancelling the tiles that haven't started)
+            self.render.close()
+            self.items.put(None)
+
+    def start(self):
+        """starts the background thread and returns the job"""
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        """asks the job to stop, nothing it computes after this is handed out"""
+        self.cancelled.set()
+
+    def isCancelled(self):
+        return self.cancelled.is_set()
+
+    def getItems(self):
+        """returns every item computed since the last call (without waiting). finished is set once the
+        job has handed out its last item, if the render raised an error it is raised here"""
+        items = []
+        while not self.isCancelled():
+            try:
+                item = self.items.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.finished = True
+                if self.error is not None:
+                    raise self.error
+                break
+            items.append(item)
+        return items
+
+class RenderScheduler:
+
+    """Remembers the parameters the fractal on screen was drawn with, so the explorer only
+    computes when the newton iteration would change and only recolors when just the colors would."""
+
+    # parameters that change the iteration data itself (everything else, like the color
+    # multiplier or the gradient flag, only changes the colors)
+    computeKeys = ('coords', 'fcn', 'maxIters', 'epsilon', 'mode', 'resolution', 'width', 'height', 'symmetry')
+
+    def __init__(self):
+        self.params = None
+        self.result = None
+        self.job = None
+        self.drawn = False
+        self.held = False
+
+    def getChanges(self, params):
+        """returns the set of parameter names that differ from the last drawn frame"""
+        if self.params is None:
+            return set(params)
+        return set(key for key in params if params[key] != self.params.get(key))
+
+    def needsCompute(self, params):
+        """true if the iteration data has to be computed again"""
+        # a render that was stopped early is started again (unless the user cleared the window)
+        if self.result is None or (not self.result.complete and not self.held and not self.isRendering()):
+            return True
+        return len(self.getChanges(params) & set(self.computeKeys)) > 0
+
+    def needsRedraw(self, params):
+        """true if the cached iteration data has to be colored and drawn again"""
+        if self.getChanges(params):
+            return True
+        return not self.drawn and not self.held
+
+    def update(self, params, result=None, job=None):
+        """records that the frame for params is now on screen (or, with a job, is being drawn by it)"""
+        self.params = dict(params)
+        if result is not None:
+            self.result = result
+            self.job = job
+        self.drawn = True
+        self.held = False
+
+    def isRendering(self):
+        """true while the background job for the frame on screen is still running"""
+        return self.job is not None and not self.job.finished and not self.job.isCancelled()
+
+    def cancel(self):
+        """stops the background job (if there is one)"""
+        if self.job is not None:
+            self.job.cancel()
+
+    def invalidate(self):
+        """the window was erased, so the frame has to be drawn again (the iteration data is still good)"""
+        self.drawn = False
+
+    def clear(self):
+        """the user cleared the window, so nothing is drawn until a parameter changes or draw() is called"""
+        self.drawn = False
+        self.held = True
+
+    def draw(self):
+        """asks for the frame to be drawn again"""
+        self.drawn = False
+        self.held = False
+
+class ViewportCache:
+
+    """The RenderResults of recently viewed frames, keyed by the parameters that change the iteration data
+    (RenderScheduler.computeKeys), so going back to a frame that was already computed (like zooming back
+    out to the default view) doesn't compute it again. The least recently used frames are dropped once
+    the samples held take up more than maxBytes."""
+
+    def __init__(self, maxBytes=64 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.results = OrderedDict()
+        self.numBytes = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    @staticmethod
+    def getKey(params):
+        return tuple(params[key] for key in RenderScheduler.computeKeys)
+
+    def get(self, params):
+        """returns the cached RenderResult for params, or None"""
+        key = self.getKey(params)
+        if key not in self.results:
+            return None
+        self.results.move_to_end(key)
+        return self.results[key]
+
+    def put(self, params, result):
+        """stores the RenderResult computed for params, dropping the oldest frames if over the budget"""
+        key = self.getKey(params)
+        if key in self.results:
+            self.numBytes -= self.results.pop(key).getBytes()
+        self.results[key] = result
+        self.numBytes += result.getBytes()
+        while self.numBytes > self.maxBytes and len(self.results) > 1:
+            self.numBytes -= self.results.popitem(last=False)[1].getBytes()
+
+    def getResumable(self, params):
+        """returns a cached RenderResult of the same frame that can be carried on to params['maxIters'] and
+        params['epsilon'] with renderResume (the one with the most iterations if there are several), or None"""
+        best = None
+        for result in self.results.values():
+            if not canResume(result, params['maxIters'], params['epsilon'], params.get('mode', 'distance')):
+                continue
+            if (list(result.coords), result.fcn, result.resolution, result.width, result.height, result.symmetry) != \
+               (list(params['coords']), params['fcn'], params['resolution'], params['width'], params['height'], params.get('symmetry', False)):
+                continue
+            if best is None or result.maxIters > best.maxIters:
+                best = result
+        return best
+
+    def getAligned(self, result):
+        """returns the cached RenderResults (complete, exact and with their z) whose samples line up with the samples
+        of result (see getSampleOffset), their samples can be copied into it instead of being computed"""
+        return [other for other in self.results.values()
+                if other.complete and other.exact and other.z is not None and getSampleOffset(other, result) is not None]
+
+    def getParent(self, params):
+        """returns the cached RenderResult with the same function and settings whose plane holds all of params['coords']
+        (the smallest one if there are several), or None. its samples can be resampled as a preview"""
+        rm, im, rM, iM = params['coords']
+        best = None
+        for result in reversed(self.results.values()):
+            prm, pim, prM, piM = result.coords
+            if result.fcn != params['fcn'] or result.maxIters != params['maxIters'] or result.epsilon != params['epsilon'] \
+               or result.mode != params.get('mode', 'distance'):
+                continue
+            if not (prm <= rm and pim <= im and rM <= prM and iM <= piM):
+                continue
+            if best is None or (prM - prm) * (piM - pim) < (best.coords[2] - best.coords[0]) * (best.coords[3] - best.coords[1]):
+                best = result
+        return best
+
+    def clear(self):
+        """drops every cached frame"""
+        self.results.clear()
+        self.numBytes = 0
+
+def getTileBlock(samples, row0, col0, width, height, resolution=1):
+    """turns a tile of samples (row 0 = bottom of the plane, like getPlaneAxes) whose bottom-left sample is
+    sample (row0, col0) into a block of pixels. every sample covers a resolution x resolution block and
+    sample (0, 0) sits in the bottom-left corner of a width x height image.
+    returns (block, x, y) where (x, y) is the top-left pixel of the block, or (None, 0, 0) if it is off the image"""
+    # flip so the largest imaginary part is at the top, then grow every sample into a block
+    block = np.asarray(samples)[::-1]
+    if resolution > 1:
+        block = np.repeat(np.repeat(block, resolution, axis=0), resolution, axis=1)
+
+    # crop whatever hangs over the top or right edge
+    x = col0 * resolution
+    y = height - row0 * resolution - block.shape[0]
+    if y < 0:
+        block = block[-y:]
+        y = 0
+    block = block[:, :max(width - x, 0)]
+    if block.shape[0] == 0 or block.shape[1] == 0:
+        return None, 0, 0
+    return block, x, y
+
+def getTiles(numRows, numCols, tileSize=None):
+    """splits a numRows x numCols grid of samples into tiles of at most tileSize x tileSize samples.
+    returns a list of (row0, row1, col0, col1), starting with the top row of tiles"""
+    if not tileSize:
+        return [(0, numRows, 0, numCols)]
+    tiles = []
+    for row0 in reversed(range(0, numRows, tileSize)):
+        for col0 in range(0, numCols, tileSize):
+            tiles.append((row0, min(row0 + tileSize, numRows), col0, min(col0 + tileSize, numCols)))
+    return tiles
+
+def computeSamples(rValues, iValues, fcn, maxIters, epsilon=.000000001, mode='distance'):
+    """runs the batched engine over the grid of starting points made from rValues and iValues.
+    returns arrays of the final z, the number of iterations and the index of the closest root"""
+    return iterateGrid(getPlaneGrid(rValues, iValues), fcn, maxIters, epsilon, mode)
+
+def computePoints(re, im, fcn, maxIters, epsilon=.000000001, mode='distance'):
+    """runs the batched engine over the starting points re[k] + im[k]*j (1d arrays).
+    returns arrays of the final z, the number of iterations and the index of the closest root"""
+    z = np.empty(len(re), dtype=complex)
+    z.real = re
+    z.imag = im
+    return iterateGrid(z, fcn, maxIters, epsilon, mode)
+
+def getConvergenceStats(iters, maxIters):
+    """returns (meanIters, notConverged) for the iteration counts of a frame: the mean number of iterations per sample and
+    the fraction of the samples that ran out of iterations (they report maxIters) instead of converging. these compare
+    how fast the iteration methods (see iterationMethods) converge for a function"""
+    iters = np.asarray(iters)
+    if iters.size == 0:
+        return 0.0, 0.0
+    return float(iters.mean(dtype=np.float64)), float((iters >= maxIters).mean())
+
+# the symmetries of the plane a SymmetryPlan can use, as (a, b, c, d) for the map x + yj -> (ax + by) + (cx + dy)j.
+# they all map a grid of samples centered on a symmetry axis onto itself
+conjugateMap = (1, 0, 0, -1)
+halfTurnMap = (-1, 0, 0, -1)
+quarterTurnMap = (0, -1, 1, 0)
+
+def applyMap(matrix, z):
+    """applies one of the maps above to a complex number or array"""
+    a, b, c, d = matrix
+    return (a * z.real + b * z.imag) + 1j * (c * z.real + d * z.imag)
+
+def multiplyMaps(first, second):
+    """returns the map that does first and then second"""
+    a, b, c, d = second
+    e, f, g, h = first
+    return (a * e + b * g, a * f + b * h, c * e + d * g, c * f + d * h)
+
+def getSymmetryGroup(fcn, square=True):
+    """returns the symmetries of fcn's newton map that a SymmetryPlan can use, as a list of (matrix, perm) without the
+    identity: matrix is one of the maps above (or a product of them) and perm[k] is the index of the root that root k
+    is mapped to. quarter turns need square samples (square=True), a rotation of order 3, 5, ... isn't used since it
+    doesn't map the samples onto each other (an order 6 rotation still gives the half turn)"""
+    fn = getFunction(fcn)
+    conjugate, rotation = fn.symmetry
+    generators = [conjugateMap] if conjugate else []
+    if rotation % 4 == 0 and square:
+        generators.append(quarterTurnMap)
+    elif rotation % 2 == 0:
+        generators.append(halfTurnMap)
+
+    # every product of the generators
+    identity = (1, 0, 0, 1)
+    maps = [identity]
+    for matrix in maps:
+        for generator in generators:
+            product = multiplyMaps(matrix, generator)
+            if product not in maps:
+                maps.append(product)
+
+    group = []
+    roots = np.array(fn.roots, dtype=complex)
+    for matrix in maps[1:]:
+        # the roots have to be mapped onto roots (this also catches a symmetry that was declared wrong)
+        distance = abs(applyMap(matrix, roots)[:, np.newaxis] - roots[np.newaxis, :])
+        perm = np.argmin(distance, axis=1)
+        if (distance[np.arange(len(roots)), perm] <= .000001 * (1 + abs(roots))).all():
+            group.append((matrix, perm.astype(np.uint8)))
+    return group
+
+class SymmetryPlan:
+
+    """Which samples of a grid have to be computed when the function is symmetric, and where each of the others
+    is copied from. A sample whose image under one of the symmetries (getSymmetryGroup) is also a sample of the grid,
+    up to a rounding error, is copied from the image with the smallest (row, col), so only that sample is computed
+    and it always comes before the ones copied from it. The copy gets the mapped back z, the same iteration count
+    and the permuted root index. The starting points of the grid are accumulated like the explorer's loops, so a
+    sample and its mirror image are only mirror images up to a rounding error, which can (rarely) change a sample
+    right on a basin boundary compared to computing it."""
+
+    def __init__(self, fcn, rValues, iValues, tolerance=.000001):
+        self.fcn = fcn
+        numRows, numCols = len(iValues), len(rValues)
+        self.numRows, self.numCols = numRows, numCols
+        rstep = (rValues[-1] - rValues[0]) / (numCols - 1) if numCols > 1 else 0.0
+        istep = (iValues[-1] - iValues[0]) / (numRows - 1) if numRows > 1 else 0.0
+        self.group = getSymmetryGroup(fcn, abs(rstep - istep) <= .000000001 * abs(rstep)) if rstep > 0 and istep > 0 else []
+
+        # for every sample, the smallest flat index of its images that are samples too (its own index if none is smaller)
+        flat = np.arange(numRows * numCols).reshape(numRows, numCols)
+        self.source = flat.copy()
+        self.element = np.full((numRows, numCols), -1, dtype=np.int8)
+        x = np.asarray(rValues, dtype=float)[np.newaxis, :]
+        y = np.asarray(iValues, dtype=float)[:, np.newaxis]
+        for e, (matrix, perm) in enumerate(self.group):
+            a, b, c, d = matrix
+            cols = (a * x + b * y - rValues[0]) / rstep
+            rows = (c * x + d * y - iValues[0]) / istep
+            nearCols, nearRows = np.rint(cols), np.rint(rows)
+            onGrid = ((abs(cols - nearCols) <= tolerance) & (abs(rows - nearRows) <= tolerance) & (nearCols >= 0) & (nearCols < numCols)
+                      & (nearRows >= 0) & (nearRows < numRows))
+            image = np.where(onGrid, nearRows * numCols + nearCols, numRows * numCols).astype(np.int64)
+            smaller = image < self.source
+            self.source[smaller] = image[smaller]
+            self.element[smaller] = e
+
+        # (because of rounding a source can be a copy itself, then the sample is just computed)
+        self.computed = self.element < 0
+        chained = ~self.computed & ~self.computed.reshape(-1)[self.source]
+        self.computed[chained] = True
+        self.element[chained] = -1
+        self.source[chained] = flat[chained]
+        self.numComputed = int(self.computed.sum())
+
+    def __repr__(self):
+        return "SymmetryPlan({} of {} samples computed)".format(self.numComputed, self.numRows * self.numCols)
+
+    def getCopies(self, rows, cols, z, iters, rootIndex):
+        """returns (z, iters, rootIndex) for the copied samples (rows[k], cols[k]), from the full (numRows, numCols)
+        arrays z, iters and rootIndex where their sources have already been computed"""
+        source = self.source[rows, cols]
+        element = self.element[rows, cols]
+        sourceRows, sourceCols = source // self.numCols, source % self.numCols
+        copyZ = z[sourceRows, sourceCols]
+        copyRoots = rootIndex[sourceRows, sourceCols]
+        for e, (matrix, perm) in enumerate(self.group):
+            these = element == e
+            if these.any():
+                # the source is the image of the sample, so the sample's z is the inverse image of the source's
+                a, b, c, d = matrix
+                copyZ[these] = applyMap((a, c, b, d), copyZ[these])
+                copyRoots[these] = np.argsort(perm).astype(np.uint8)[copyRoots[these]]
+        return copyZ, iters[sourceRows, sourceCols], copyRoots
+
+def getSymmetryPlan(fcn, rValues, iValues, minSaving=.1):
+    """returns a SymmetryPlan for the grid made from rValues and iValues, or None if fcn's symmetries would save less
+    than minSaving of the samples (like a viewport that doesn't cross a symmetry axis)"""
+    conjugate, rotation = getFunction(fcn).symmetry
+    if not conjugate and rotation < 2:
+        return None
+    plan = SymmetryPlan(fcn, rValues, iValues)
+    if plan.numComputed > (1 - minSaving) * plan.numRows * plan.numCols:
+        return None
+    return plan
+
+def renderSymmetric(rValues, iValues, fcn, maxIters, epsilon=.000000001, workers=1, bandRows=64, mode='distance', plan=None):
+    """computes the grid of starting points band by band (bandRows rows at a time, from the bottom up) like renderTiles,
+    but only computes the samples plan (a SymmetryPlan, made here if it isn't given) says to and copies the rest from
+    their mirror images, which are always in the same band or one below it. yields (row0, 0, z, iters, rootIndex) for
+    every band. with more than one worker the computed samples of every band are sent to the process pool at once"""
+    numRows, numCols = len(iValues), len(rValues)
+    if plan is None:
+        plan = SymmetryPlan(fcn, rValues, iValues)
+    z = np.zeros((numRows, numCols), dtype=complex)
+    iters = np.zeros((numRows, numCols), dtype=np.int64)
+    rootIndex = np.zeros((numRows, numCols), dtype=np.uint8)
+
+    bands = []
+    for row0 in range(0, numRows, bandRows):
+        row1 = min(row0 + bandRows, numRows)
+        rows, cols = np.nonzero(plan.computed[row0:row1])
+        bands.append((row0, row1, rows + row0, cols))
+    futures = []
+    if workers != 1:
+        pool = getProcessPool(workers)
+        futures = [submitTask(pool, computePoints, rValues[cols], iValues[rows], getFunction(fcn), maxIters, epsilon, mode)
+                   for row0, row1, rows, cols in bands]
+    try:
+        for n, (row0, row1, rows, cols) in enumerate(bands):
+            if futures:
+                bandZ, bandIters, bandRoots = getTaskResult(futures[n])
+            else:
+                bandZ, bandIters, bandRoots = computePoints(rValues[cols], iValues[rows], fcn, maxIters, epsilon, mode)
+            z[rows, cols], iters[rows, cols], rootIndex[rows, cols] = bandZ, bandIters, bandRoots
+
+            copyRows, copyCols = np.nonzero(~plan.computed[row0:row1])
+            copyRows += row0
+            z[copyRows, copyCols], iters[copyRows, copyCols], rootIndex[copyRows, copyCols] = plan.getCopies(copyRows, copyCols, z, iters, rootIndex)
+            yield row0, 0, z[row0:row1].copy(), iters[row0:row1].copy(), rootIndex[row0:row1].copy()
+    finally:
+        # if the caller stopped early, drop the bands that have not started yet
+        for future in futures:
+            future.cancel()
+
+def getPassSamples(numRows, numCols, step, firstPass=False):
+    """returns arrays of the (row, col) of the samples a progressive pass with this step computes: the samples on every
+    step-th row and column, except the ones the pass before (with twice the step) already did"""
+    rows, cols = np.meshgrid(np.arange(0, numRows, step), np.arange(0, numCols, step), indexing='ij')
+    if not firstPass:
+        new = (rows % (2 * step) != 0) | (cols % (2 * step) != 0)
+        rows, cols = rows[new], cols[new]
+    return rows.reshape(-1), cols.reshape(-1)
+
+def getCoarseSamples(samples, step):
+    """returns the samples as they look after the progressive pass with this step: every sample takes the value
+    of the computed sample at the bottom-left corner of its step x step block"""
+    if step == 1:
+        return samples
+    coarse = np.repeat(np.repeat(samples[::step, ::step], step, axis=0), step, axis=1)
+    return coarse[:samples.shape[0], :samples.shape[1]]
+
+# one process pool is kept alive between renders so the workers only have to start up once
+_processPool = None
+_processPoolWorkers = 0
+_processPoolLock = threading.RLock()
+
+def getPoolContext():
+    """returns the multiprocessing context the pool starts its workers with (None for the default one). once Tk is
+    running (the explorer) the pool is usually first needed on the render thread, and forking a process that runs Tk
+    from a thread isn't safe, so then the workers are forked from a clean forkserver process (with the render modules
+    already imported) where there is one, and spawned otherwise. without Tk (headless renders) the default is fine"""
+    if DEgraphics._root is None:
+        return None
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['NewtonRender'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def submitTask(pool, function, *args):
+    """submits function(*args) to the process pool. while a profile is being recorded the worker records one of its
+    own (runProfiled) and getTaskResult adds its stages to this one, since the newton steps and root search happen there"""
+    profile = getProfile()
+    future = pool.submit(function, *args) if profile is None else pool.submit(runProfiled, function, *args)
+    future.profile = profile
+    return future
+
+def getTaskResult(future):
+    """returns the result of a future from submitTask, adding the stages the worker recorded to the profile"""
+    result = future.result()
+    if future.profile is None:
+        return result
+    result, stages = result
+    future.profile.addStages(*stages)
+    return result
+
+def getProcessPool(workers=None):
+    """returns the shared process pool, (re)starting it if the number of workers changed"""
+    global _processPool, _processPoolWorkers
+    workers = workers or os.cpu_count() or 1
+    with _processPoolLock:
+        if _processPool is None or _processPoolWorkers != workers:
+            shutdownProcessPool()
+            _processPool = ProcessPoolExecutor(max_workers=workers, mp_context=getPoolContext())
+            _processPoolWorkers = workers
+        return _processPool
+
+def shutdownProcessPool():
+    """stops the shared process pool (if there is one)"""
+    global _processPool, _processPoolWorkers
+    with _processPoolLock:
+        if _processPool is not None:
+            _processPool.shutdown(cancel_futures=True)
+        _processPool = None
+        _processPoolWorkers = 0
+
+def renderTiles(rValues, iValues, fcn, maxIters, epsilon=.000000001, workers=None, tileSize=64, mode='distance', tiles=None):
+    """computes the grid of starting points tile by tile, yielding (row0, col0, z, iters, rootIndex) for each tile
+    as soon as it is done. with more than one worker the tiles are computed in a process pool (workers=None uses every core).
+    tiles is an optional list of the (row0, row1, col0, col1) tiles to compute, by default the whole grid is"""
+    if tiles is None:
+        tiles = getTiles(len(iValues), len(rValues), tileSize)
+
+    # a single worker just computes the tiles in order, without starting any processes
+    if workers == 1:
+        for row0, row1, col0, col1 in tiles:
+            yield (row0, col0) + computeSamples(rValues[col0:col1], iValues[row0:row1], fcn, maxIters, epsilon, mode)
+        return
+
+    # the worker processes get the function itself, so functions registered at run time work there too
+    fcn = getFunction(fcn)
+    pool = getProcessPool(workers)
+    futures = {}
+    for row0, row1, col0, col1 in tiles:
+        future = submitTask(pool, computeSamples, rValues[col0:col1], iValues[row0:row1], fcn, maxIters, epsilon, mode)
+        futures[future] = (row0, col0)
+    try:
+        for future in as_completed(futures):
+            yield futures[future] + getTaskResult(future)
+    finally:
+        # if the caller stopped early, drop the tiles that have not started yet
+        for future in futures:
+            future.cancel()
+
+def renderProgressive(rValues, iValues, fcn, maxIters, epsilon=.000000001, numPasses=4, workers=1, chunkSize=16384, mode='distance', plan=None):
+    """computes the grid of starting points in numPasses passes, starting with every 2^(numPasses-1)-th sample and
+    halving the step each pass, so a coarse picture is ready long before the full one. every sample is only computed once.
+    yields (step, passDone, rows, cols, z, iters, rootIndex) for chunks of at most chunkSize samples, passDone is true
+    for the last chunk of each pass. with more than one worker the chunks of a pass are computed in the process pool.
+    with a SymmetryPlan, a pass only computes the samples the plan says to (and the ones whose source isn't known
+    by the end of the pass), the rest are copied in one last chunk"""
+    numRows, numCols = len(iValues), len(rValues)
+    steps = [2 ** k for k in reversed(range(max(numPasses, 1)))]
+    if plan is not None:
+        z = np.zeros((numRows, numCols), dtype=complex)
+        iters = np.zeros((numRows, numCols), dtype=np.int64)
+        rootIndex = np.zeros((numRows, numCols), dtype=np.uint8)
+        known = np.zeros((numRows, numCols), dtype=bool)
+    for step in steps:
+        rows, cols = getPassSamples(numRows, numCols, step, step == steps[0])
+        if plan is not None:
+            # a sample is copied if its source is known already or is computed in this pass
+            copy = ~plan.computed[rows, cols]
+            source = plan.source[rows[copy], cols[copy]]
+            computedNow = np.zeros(numRows * numCols, dtype=bool)
+            computedNow[(rows * numCols + cols)[~copy]] = True
+            copy[copy] = known.reshape(-1)[source] | computedNow[source]
+            copyRows, copyCols = rows[copy], cols[copy]
+            rows, cols = rows[~copy], cols[~copy]
+        chunks = [(rows[k:k + chunkSize], cols[k:k + chunkSize]) for k in range(0, len(rows), chunkSize)]
+        lastChunk = len(chunks) - 1 if plan is None else -1
+        if workers == 1:
+            computed = ((chunkRows, chunkCols) + computePoints(rValues[chunkCols], iValues[chunkRows], fcn, maxIters, epsilon, mode)
+                        for chunkRows, chunkCols in chunks)
+        else:
+            pool = getProcessPool(workers)
+            futures = {}
+            for chunkRows, chunkCols in chunks:
+                futures[submitTask(pool, computePoints, rValues[chunkCols], iValues[chunkRows], getFunction(fcn), maxIters, epsilon, mode)] = (chunkRows, chunkCols)
+            computed = (futures[future] + getTaskResult(future) for future in as_completed(futures))
+        try:
+            for n, item in enumerate(computed):
+                if plan is not None:
+                    chunkRows, chunkCols, chunkZ, chunkIters, chunkRoots = item
+                    z[chunkRows, chunkCols], iters[chunkRows, chunkCols], rootIndex[chunkRows, chunkCols] = chunkZ, chunkIters, chunkRoots
+                    known[chunkRows, chunkCols] = True
+                yield (step, n == lastChunk) + item
+        finally:
+            # if the caller stopped early, drop the chunks that have not started yet
+            if workers != 1:
+                for future in futures:
+                    future.cancel()
+
+        if plan is not None:
+            copies = plan.getCopies(copyRows, copyCols, z, iters, rootIndex)
+            z[copyRows, copyCols], iters[copyRows, copyCols], rootIndex[copyRows, copyCols] = copies
+            known[copyRows, copyCols] = True
+            yield (step, True, copyRows, copyCols) + copies
+
+def canResume(result, maxIters, epsilon, mode='distance'):
+    """true if the samples of result can be carried on to maxIters and epsilon instead of being computed again: it has
+    to be complete, exact, have its final z and use the distance mode, and maxIters can only go up and epsilon only down.
+    (with a bigger epsilon a point could have stopped earlier, and the z it had then is gone)"""
+    return (result.complete and result.exact and result.z is not None and result.mode == 'distance' and mode == 'distance'
+            and maxIters >= result.maxIters and epsilon <= result.epsilon and (maxIters, epsilon) != (result.maxIters, result.epsilon))
+
+def getResumePoints(result, maxIters, epsilon):
+    """returns arrays of the (row, col) of the samples of result that still need work for maxIters and epsilon: the ones
+    that aren't within epsilon of a root (or lost to nan) and have had fewer than maxIters iterations"""
+    z = ComplexGrid(np.asarray(result.z.real), np.asarray(result.z.imag))
+    with np.errstate(invalid='ignore'):
+        converged = getRootIndex(getFunction(result.fcn).roots, epsilon).queryGrid(z)[1].reshape(result.z.shape)
+    return np.nonzero(~converged & (result.iters < maxIters))
+
+def getResumedResult(result, maxIters, epsilon):
+    """returns a copy of result with maxIters and epsilon, for renderResume to carry on (result itself is not changed)"""
+    resumed = RenderResult(0, 0, result.coords, result.fcn, maxIters, epsilon, result.width, result.height, result.resolution, mode=result.mode)
+    resumed.rootIndex = np.array(result.rootIndex)
+    resumed.iters = np.array(result.iters, dtype=np.uint16 if maxIters <= np.iinfo(np.uint16).max else np.uint32)
+    resumed.z = np.array(result.z)
+    resumed.symmetry = result.symmetry
+    return resumed
+
+def resumePoints(z, iters, fcn, maxIters, epsilon=.000000001):
+    """carries the points z (1d), which have already had iters iterations, on to maxIters and epsilon.
+    returns arrays of the final z, the number of iterations and the index of the closest root"""
+    return newtonsNumItersGrid(z, fcn, getFunction(fcn).roots, maxIters, epsilon, startIters=iters)
+
+def renderResume(result, maxIters, epsilon=.000000001, workers=1, chunkSize=16384):
+    """carries a finished render on to a higher maxIters or a smaller epsilon (see canResume): only the samples that
+    haven't converged are iterated, starting from their stored z and iteration count, so they end up exactly where
+    computing them from scratch would. yields (rows, cols, z, iters, rootIndex) for chunks of at most chunkSize samples,
+    computed in the process pool with more than one worker"""
+    rows, cols = getResumePoints(result, maxIters, epsilon)
+    chunks = [(rows[k:k + chunkSize], cols[k:k + chunkSize]) for k in range(0, len(rows), chunkSize)]
+    if workers == 1:
+        for chunkRows, chunkCols in chunks:
+            yield (chunkRows, chunkCols) + resumePoints(result.z[chunkRows, chunkCols], result.iters[chunkRows, chunkCols], result.fcn, maxIters, epsilon)
+        return
+
+    pool = getProcessPool(workers)
+    futures = {}
+    for chunkRows, chunkCols in chunks:
+        futures[submitTask(pool, resumePoints, result.z[chunkRows, chunkCols], result.iters[chunkRows, chunkCols],
+                            getFunction(result.fcn), maxIters, epsilon)] = (chunkRows, chunkCols)
+    try:
+        for future in as_completed(futures):
+            yield futures[future] + getTaskResult(future)
+    finally:
+        # if the caller stopped early, drop the chunks that have not started yet
+        for future in futures:
+            future.cancel()
+
+def getResizedResult(result, width, height):
+    """returns a RenderResult of the same frame and settings as result for a width x height window, with every sample
+    taken from the nearest sample of result (see RenderResult.resample), so a frame saved at another size can be shown
+    without running newtons method. it isn't exact and has no z"""
+    rValues, iValues = getPlaneAxes(result.coords, width, height, result.resolution)
+    resized = RenderResult(len(iValues), len(rValues), result.coords, result.fcn, result.maxIters, result.epsilon, width, height,
+                           result.resolution, keepZ=False, mode=result.mode)
+    resized.rootIndex[:], resized.iters[:] = result.resample(rValues, iValues)
+    resized.exact = False
+    resized.symmetry = result.symmetry
+    return resized
+
+def getPanCoords(coords, width, height, resolution, dCols, dRows):
+    """returns the coords of the frame moved dCols samples to the right and dRows samples up.
+    (whole samples, so the samples that stay in view line up with the ones of the old frame)"""
+    rm, im, rM, iM = coords
+    rShift = dCols * resolution * (rM - rm) / width
+    iShift = dRows * resolution * (iM - im) / height
+    return [rm + rShift, im + iShift, rM + rShift, iM + iShift]
+
+def getSampleOffset(source, target):
+    """returns (dRows, dCols) such that sample (row, col) of target is sample (row + dRows, col + dCols) of source, or None
+    if their samples don't line up (a different function or settings, a different sample spacing, or not a whole number
+    of samples apart)"""
+    settings = ('fcn', 'maxIters', 'epsilon', 'mode', 'resolution', 'width', 'height')
+    if any(getattr(source, key) != getattr(target, key) for key in settings):
+        return None
+    rstep = target.resolution * (target.coords[2] - target.coords[0]) / target.width
+    istep = target.resolution * (target.coords[3] - target.coords[1]) / target.height
+    sourceRStep = source.resolution * (source.coords[2] - source.coords[0]) / source.width
+    sourceIStep = source.resolution * (source.coords[3] - source.coords[1]) / source.height
+    if abs(sourceRStep - rstep) > 1e-9 * abs(rstep) or abs(sourceIStep - istep) > 1e-9 * abs(istep):
+        return None
+    dCols = (target.coords[0] - source.coords[0]) / rstep
+    dRows = (target.coords[1] - source.coords[1]) / istep
+    if abs(dCols - round(dCols)) > 1e-6 or abs(dRows - round(dRows)) > 1e-6:
+        return None
+    return int(round(dRows)), int(round(dCols))
+
+def getOverlap(source, target, dRows, dCols, numRows=None, numCols=None):
+    """returns the (row0, row1, col0, col1) rectangle of target samples that are also in source (with the offset of
+    getSampleOffset), or None if they don't overlap. numRows and numCols limit it to that many rows and columns of source"""
+    numRows = source.iters.shape[0] if numRows is None else min(numRows, source.iters.shape[0])
+    numCols = source.iters.shape[1] if numCols is None else min(numCols, source.iters.shape[1])
+    row0, row1 = max(0, -dRows), min(target.iters.shape[0], numRows - dRows)
+    col0, col1 = max(0, -dCols), min(target.iters.shape[1], numCols - dCols)
+    if row0 >= row1 or col0 >= col1:
+        return None
+    return row0, row1, col0, col1
+
+def getPannedResult(result, dCols, dRows):
+    """returns (panned, known): a RenderResult for the frame of result moved dCols samples right and dRows up, holding
+    the samples of result that were fully on screen and still are, and the (row0, row1, col0, col1) rectangle of them
+    (None if there are none), so they are exactly the pixels that can be shifted.
+    the samples that are kept started from the points of the old frame, which can differ from the ones a new render
+    of the moved frame starts from by a rounding error"""
+    coords = getPanCoords(result.coords, result.width, result.height, result.resolution, dCols, dRows)
+    rValues, iValues = getPlaneAxes(coords, result.width, result.height, result.resolution)
+    panned = RenderResult(len(iValues), len(rValues), coords, result.fcn, result.maxIters, result.epsilon, result.width,
+                          result.height, result.resolution, keepZ=result.z is not None, mode=result.mode)
+    panned.exact = result.exact
+    panned.symmetry = result.symmetry
+    known = getOverlap(result, panned, dRows, dCols, result.height // result.resolution, result.width // result.resolution)
+    if known is not None:
+        row0, row1, col0, col1 = known
+        source = (slice(row0 + dRows, row1 + dRows), slice(col0 + dCols, col1 + dCols))
+        panned.setSamples(row0, col0, result.z[source] if result.z is not None else np.zeros((row1 - row0, col1 - col0), dtype=complex),
+                          result.iters[source], result.rootIndex[source])
+    return panned, known
+
+def getExposedRects(numRows, numCols, known):
+    """returns the (row0, row1, col0, col1) rectangles that cover a numRows x numCols frame except the known rectangle
+    (the strips a pan uncovers: below and above it, then left and right of it)"""
+    if known is None:
+        return [(0, numRows, 0, numCols)]
+    row0, row1, col0, col1 = known
+    rects = [(0, row0, 0, numCols), (row1, numRows, 0, numCols), (row0, row1, 0, col0), (row0, row1, col1, numCols)]
+    return [rect for rect in rects if rect[0] < rect[1] and rect[2] < rect[3]]
+
+def renderPan(panned, known, sources=(), workers=1, tileSize=64):
+    """computes the samples of a panned frame (see getPannedResult) that weren't in view before, tile by tile, so the
+    cost goes with the area uncovered. a tile that one of sources (frames whose samples line up, see
+    ViewportCache.getAligned) holds all of is copied from it instead of computed.
+    yields (row0, col0, z, iters, rootIndex) for every tile, like renderTiles"""
+    rValues, iValues = getPlaneAxes(panned.coords, panned.width, panned.height, panned.resolution)
+    tiles = []
+    for rectRow0, rectRow1, rectCol0, rectCol1 in getExposedRects(len(iValues), len(rValues), known):
+        for row0, row1, col0, col1 in getTiles(rectRow1 - rectRow0, rectCol1 - rectCol0, tileSize):
+            tiles.append((rectRow0 + row0, rectRow0 + row1, rectCol0 + col0, rectCol0 + col1))
+
+    offsets = []
+    for source in sources:
+        offset = getSampleOffset(source, panned)
+        if offset is not None and source.z is not None:
+            offsets.append((source, offset))
+    toCompute = []
+    for row0, row1, col0, col1 in tiles:
+        for source, (dRows, dCols) in offsets:
+            overlap = getOverlap(source, panned, dRows, dCols)
+            if overlap is not None and overlap[0] <= row0 and row1 <= overlap[1] and overlap[2] <= col0 and col1 <= overlap[3]:
+                block = (slice(row0 + dRows, row1 + dRows), slice(col0 + dCols, col1 + dCols))
+                yield row0, col0, source.z[block], source.iters[block], source.rootIndex[block]
+                break
+        else:
+            toCompute.append((row0, row1, col0, col1))
+
+    yield from renderTiles(rValues, iValues, panned.fcn, panned.maxIters, panned.epsilon, workers, tileSize, panned.mode, toCompute)
+
+def getRanges(starts, lengths):
+    """returns (values, owner): the ranges starts[k] .. starts[k] + lengths[k] - 1 one after another, and the k each value came from"""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    owner = np.repeat(np.arange(len(lengths)), lengths)
+    # the position of every value inside its own range
+    offsets = np.arange(owner.size) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(np.asarray(starts, dtype=np.int64), lengths) + offsets, owner
+
+def getRectBorders(r0, r1, c0, c1):
+    """returns (rows, cols, owner): the (row, col) of the samples on the borders of the rectangles of samples
+    r0[k]..r1[k], c0[k]..c1[k] (inclusive, arrays of them), grouped by rectangle, and the rectangle each one is on"""
+    bottomCols, bottomOwner = getRanges(c0, c1 - c0 + 1)
+    sideRows, sideOwner = getRanges(r0 + 1, np.maximum(r1 - r0 - 1, 0))
+    rows = np.concatenate([r0[bottomOwner], r1[bottomOwner], sideRows, sideRows])
+    cols = np.concatenate([bottomCols, bottomCols, c0[sideOwner], c1[sideOwner]])
+    owner = np.concatenate([bottomOwner, bottomOwner, sideOwner, sideOwner])
+    order = np.argsort(owner, kind='stable')
+    return rows[order], cols[order], owner[order]
+
+def getRectInsides(r0, r1, c0, c1):
+    """returns (rows, cols, owner): the (row, col) of the samples inside the rectangles r0[k]..r1[k], c0[k]..c1[k]
+    (not on their borders), grouped by rectangle, and the rectangle each one is in"""
+    height, width = r1 - r0 - 1, c1 - c0 - 1
+    k, owner = getRanges(np.zeros(len(r0), dtype=np.int64), height * width)
+    return r0[owner] + 1 + k // width[owner], c0[owner] + 1 + k % width[owner], owner
+
+def getEdges(numSamples, tileSize):
+    """returns the rows (or columns) that split numSamples samples into tiles that share their border samples"""
+    return sorted(set(list(range(0, numSamples - 1, tileSize)) + [numSamples - 1]))
+
+def getBilinearFill(samples, rows, cols, r0, r1, c0, c1):
+    """returns the samples at (rows, cols) filled by blending the four corner samples of the rectangle
+    r0..r1, c0..c1 each one is in (arrays, one rectangle per sample), rounded"""
+    t = (rows - r0) / (r1 - r0)
+    u = (cols - c0) / (c1 - c0)
+    bottom = samples[r0, c0] * (1 - u) + samples[r0, c1] * u
+    top = samples[r1, c0] * (1 - u) + samples[r1, c1] * u
+    return np.rint(bottom * (1 - t) + top * t).astype(samples.dtype)
+
+def computePointChunks(rValues, iValues, rows, cols, fcn, maxIters, epsilon=.000000001, mode='distance', workers=1, chunkSize=16384):
+    """computes the starting points (rValues[cols[k]], iValues[rows[k]]), yielding (rows, cols, z, iters, rootIndex) for
+    each chunk of chunkSize points as soon as it is done. with more than one worker the chunks are computed in the process pool"""
+    if workers == 1:
+        yield (rows, cols) + computePoints(rValues[cols], iValues[rows], fcn, maxIters, epsilon, mode)
+        return
+    pool = getProcessPool(workers)
+    futures = {}
+    for k in range(0, len(rows), chunkSize):
+        chunkRows, chunkCols = rows[k:k + chunkSize], cols[k:k + chunkSize]
+        futures[submitTask(pool, computePoints, rValues[chunkCols], iValues[chunkRows], getFunction(fcn), maxIters, epsilon, mode)] = (chunkRows, chunkCols)
+    try:
+        for future in as_completed(futures):
+            yield futures[future] + getTaskResult(future)
+    finally:
+        # if the caller stopped early, drop the chunks that have not started yet
+        for future in futures:
+            future.cancel()
+
+def renderAdaptive(rValues, iValues, fcn, maxIters, epsilon=.000000001, tolerance=0, tileSize=32, minSize=4, mode='distance', workers=1, chunkSize=4096):
+    """computes the grid of starting points by subdivision (like the Mariani-Silver algorithm): the border of each tile is
+    computed first, and if every border sample went to the same root and their iteration counts are within tolerance of
+    each other the inside of the tile is filled without running newtons method. otherwise the tile is split in four and the
+    same is done for each quarter, down to minSize samples, where the inside is just computed.
+    this is not exact (a small basin can sit inside a tile with a uniform border), a bigger tolerance fills more tiles.
+    every tile of a level is checked, filled and split together with array operations, and the samples the next
+    level needs are computed in one batch (split in chunks of chunkSize for the process pool when workers != 1).
+    yields (computed, rows, cols, z, iters, rootIndex) for every batch of samples, computed is false for filled samples
+    (their z is the root they were filled with, and their iterations are blended from the corners of the tile)"""
+    numRows, numCols = len(iValues), len(rValues)
+    rootList = getFunction(fcn).roots
+    rootIndex = np.zeros((numRows, numCols), dtype=np.uint8)
+    iters = np.zeros((numRows, numCols), dtype=np.int64)
+    known = np.zeros((numRows, numCols), dtype=bool)
+
+    # too small to have any tiles, so every sample is computed
+    if numRows < 3 or numCols < 3:
+        rows, cols = np.meshgrid(np.arange(numRows), np.arange(numCols), indexing='ij')
+        rows, cols = rows.reshape(-1), cols.reshape(-1)
+        yield (True, rows, cols) + computePoints(rValues[cols], iValues[rows], fcn, maxIters, epsilon, mode)
+        return
+
+    # the tiles of the current level, as arrays of their first and last rows and columns
+    rowEdges, colEdges = np.array(getEdges(numRows, tileSize)), np.array(getEdges(numCols, tileSize))
+    r0, c0 = [a.reshape(-1) for a in np.meshgrid(rowEdges[:-1], colEdges[:-1], indexing='ij')]
+    r1, c1 = [a.reshape(-1) for a in np.meshgrid(rowEdges[1:], colEdges[1:], indexing='ij')]
+    pendingRows, pendingCols, owner = getRectBorders(r0, r1, c0, c1)
+    while True:
+        # compute every sample the tiles need that isn't known yet, all in one batch
+        flat = np.unique(pendingRows * numCols + pendingCols)
+        flat = flat[~known.reshape(-1)[flat]]
+        rows, cols = flat // numCols, flat % numCols
+        if len(flat) > 0:
+            for rows, cols, z, batchIters, batchRoots in computePointChunks(rValues, iValues, rows, cols, fcn, maxIters, epsilon, mode, workers, chunkSize):
+                rootIndex[rows, cols] = batchRoots
+                iters[rows, cols] = batchIters
+                known[rows, cols] = True
+                yield True, rows, cols, z, batchIters, batchRoots
+
+        # tiles without an inside are done
+        inside = (r1 - r0 >= 2) & (c1 - c0 >= 2)
+        r0, r1, c0, c1 = r0[inside], r1[inside], c0[inside], c1[inside]
+        if len(r0) == 0:
+            return
+
+        # check the borders of every tile at once: one root, and iteration counts within tolerance of each other
+        borderRows, borderCols, owner = getRectBorders(r0, r1, c0, c1)
+        starts = np.searchsorted(owner, np.arange(len(r0)))
+        borderRoots, borderIters = rootIndex[borderRows, borderCols], iters[borderRows, borderCols]
+        uniform = (np.minimum.reduceat(borderRoots, starts) == np.maximum.reduceat(borderRoots, starts)) & \
+                  (np.maximum.reduceat(borderIters, starts) - np.minimum.reduceat(borderIters, starts) <= tolerance)
+        small = ~uniform & ((r1 - r0 <= minSize) | (c1 - c0 <= minSize))
+        split = ~uniform & ~small
+
+        # fill the uniform tiles
+        if uniform.any():
+            fill = np.nonzero(uniform)[0]
+            rows, cols, owner = getRectInsides(r0[fill], r1[fill], c0[fill], c1[fill])
+            fill = fill[owner]
+            batchRoots = rootIndex[r0[fill], c0[fill]]
+            batchIters = getBilinearFill(iters, rows, cols, r0[fill], r1[fill], c0[fill], c1[fill])
+            rootIndex[rows, cols] = batchRoots
+            iters[rows, cols] = batchIters
+            known[rows, cols] = True
+            yield False, rows, cols, np.array(rootList, dtype=complex)[batchRoots], batchIters, batchRoots
+
+        # the insides of the small tiles are computed, and the others are split in four, where the two new lines of
+        # samples are the only new border samples
+        insideRows, insideCols, owner = getRectInsides(r0[small], r1[small], c0[small], c1[small])
+        r0, r1, c0, c1 = r0[split], r1[split], c0[split], c1[split]
+        rm, cm = (r0 + r1) // 2, (c0 + c1) // 2
+        lineCols, lineOwner = getRanges(c0 + 1, c1 - c0 - 1)
+        lineRows, columnOwner = getRanges(r0 + 1, r1 - r0 - 1)
+        pendingRows = np.concatenate([insideRows, rm[lineOwner], lineRows])
+        pendingCols = np.concatenate([insideCols, lineCols, cm[columnOwner]])
+        r0, r1, c0, c1 = np.concatenate([r0, r0, rm, rm]), np.concatenate([rm, rm, r1, r1]), \
+                         np.concatenate([c0, cm, c0, cm]), np.concatenate([cm, c1, cm, c1])
+
+def renderNewtonFractal(coords, fcn, maxIters, epsilon=.000000001, colorscheme='1', width=400, height=400,
+                        resolution=1, gradient=True, multCol=5, workers=1, tileSize=None, tolerance=None, mode='distance', symmetry=False):
+    """renders the newtons fractal of function fcn over coords = [rm, im, rM, iM] into a PixelBuffer without opening a window.
+    the starting points and colors are the same ones generateNewtonFractal uses for a window of the same size.
+    with workers > 1 (or None for every core) the plane is split into tileSize x tileSize tiles computed in parallel.
+    if tolerance is not None the (approximate) adaptive subdivision of renderAdaptive is used instead.
+    with symmetry on, the samples that are mirror images of others are copied from them (see SymmetryPlan)"""
+    rValues, iValues = getPlaneAxes(coords, width, height, resolution)
+    if workers != 1 and not tileSize:
+        tileSize = 64
+
+    # each tile is colored and copied into the buffer as soon as it arrives
+    palette = getPalette(len(getFunction(fcn).roots), maxIters, colorscheme, multCol, gradient)
+    buffer = PixelBuffer(width, height)
+    if tolerance is not None:
+        result = RenderResult(len(iValues), len(rValues), coords, fcn, maxIters, epsilon, width, height, resolution, keepZ=False, mode=mode)
+        result.exact = False
+        for computed, rows, cols, z, iters, rootIndex in renderAdaptive(rValues, iValues, fcn, maxIters, epsilon, tolerance, mode=mode, workers=workers or os.cpu_count() or 1):
+            result.setPoints(rows, cols, z, iters, rootIndex)
+        buffer.setSamples(palette.getColors(result.rootIndex, result.iters), 0, 0, resolution)
+        return buffer
+    plan = getSymmetryPlan(fcn, rValues, iValues) if symmetry else None
+    if plan is not None:
+        render = renderSymmetric(rValues, iValues, fcn, maxIters, epsilon, workers, tileSize or 64, mode, plan)
+    else:
+        render = renderTiles(rValues, iValues, fcn, maxIters, epsilon, workers, tileSize, mode)
+    for row0, col0, z, iters, rootIndex in render:
+        buffer.setSamples(palette.getColors(rootIndex, iters), row0, col0, resolution)
+    return buffer